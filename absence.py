@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+from database import connection
+from instrumentation import timed
+from query_cache import cached_query
+
+# --- Daily Absence Index ---
+# daily_absences holds one row per (day, employee) of approved leave and absence_counts the number of
+# employees out on each day (migration 7). Approvals add their days in the same transaction
+# (record_absences), so "who is out on D" is a primary-key range read and the absence count for any
+# range reads one row per day, however many years of leave history there are.
+
+def _leave_days(start_date, end_date):
+    """Yields every 'YYYY-MM-DD' day from start_date to end_date inclusive (nothing for malformed dates)."""
+    try:
+        day = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return
+    while day <= end:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+def record_absences(conn, leaves):
+    """
+    Adds the days of newly approved leaves to the index on a connection that is already inside a write
+    transaction. leaves is an iterable of (leave_id, emp_id, start_date, end_date). A day already
+    covered by another approved leave of the same employee is kept once, and the counts of every
+    touched day are recomputed from the index rather than incremented, so they stay exact.
+    """
+    rows = [(day, emp_id, leave_id) for leave_id, emp_id, start_date, end_date in leaves
+            for day in _leave_days(start_date, end_date)]
+    if not rows:
+        return
+    conn.executemany('INSERT OR IGNORE INTO daily_absences (day, emp_id, leave_id) VALUES (?, ?, ?)', rows)
+    conn.executemany('INSERT OR REPLACE INTO absence_counts (day, absent) '
+                     'SELECT ?, COUNT(*) FROM daily_absences WHERE day = ?',
+                     [(day, day) for day in sorted({row[0] for row in rows})])
+
+# Expands approved leave requests (optionally restricted by {where}) into one row per day. The unary
+# + keeps the planner off the status index: a restriction to a few leave_ids is then a rowid lookup
+# per listed leave instead of a probe per approved leave, and a full rebuild is a plain table scan.
+_LEAVE_DAYS_CTE = '''
+    WITH RECURSIVE leave_days(day, emp_id, leave_id, end_date) AS (
+        SELECT start_date, emp_id, leave_id, end_date FROM leave_requests
+        WHERE +status = 'approved' AND date(start_date) = start_date AND date(end_date) = end_date {where}
+        UNION ALL
+        SELECT date(day, '+1 day'), emp_id, leave_id, end_date FROM leave_days WHERE day < end_date
+    )
+'''
+
+def rebuild_absences(conn):
+    """Recomputes the whole index from the approved leave requests, set-based (e.g. after a bulk load)."""
+    conn.execute('DELETE FROM daily_absences')
+    conn.execute('DELETE FROM absence_counts')
+    conn.execute(_LEAVE_DAYS_CTE.format(where='') + '''
+        INSERT OR IGNORE INTO daily_absences (day, emp_id, leave_id)
+        SELECT day, emp_id, leave_id FROM leave_days
+    ''')
+    conn.execute('INSERT INTO absence_counts (day, absent) SELECT day, COUNT(*) FROM daily_absences GROUP BY day')
+
+def _stage_leave_days(conn, table, added):
+    """Expands the approved leaves listed in `table` into the reindexed_absences temp table."""
+    conn.execute(_LEAVE_DAYS_CTE.format(where=f"AND leave_id IN (SELECT leave_id FROM {table})") +
+                 'INSERT INTO reindexed_absences (day, emp_id, leave_id, added) '
+                 'SELECT day, emp_id, leave_id, ? FROM leave_days', (added,))
+
+def unindex_leaves(conn, table):
+    """
+    Set-based first half of re-indexing the leaves whose leave_id is listed in `table` (e.g. a bulk
+    import's staging table): removes the days their current rows contribute. Call it before the
+    leaves are rewritten and index_leaves(conn, table) after; both run inside the caller's transaction.
+    """
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS reindexed_absences (day TEXT, emp_id INTEGER, leave_id INTEGER, added INTEGER)')
+    conn.execute('DELETE FROM reindexed_absences')
+    _stage_leave_days(conn, table, 0)
+    conn.execute('DELETE FROM daily_absences WHERE (day, emp_id, leave_id) IN '
+                 '(SELECT day, emp_id, leave_id FROM reindexed_absences)')
+
+def index_leaves(conn, table):
+    """Second half of unindex_leaves: adds the days of the listed leaves now approved and recounts every touched day."""
+    _stage_leave_days(conn, table, 1)
+    # In primary-key order, so the inserts append to neighbouring pages of the WITHOUT ROWID table
+    conn.execute('INSERT OR IGNORE INTO daily_absences (day, emp_id, leave_id) '
+                 'SELECT day, emp_id, leave_id FROM reindexed_absences WHERE added ORDER BY day, emp_id')
+    conn.execute('INSERT OR REPLACE INTO absence_counts (day, absent) '
+                 'SELECT r.day, (SELECT COUNT(*) FROM daily_absences a WHERE a.day = r.day) '
+                 'FROM (SELECT DISTINCT day FROM reindexed_absences) r')
+
+# --- Queries ---
+
+def _date_range(date_from, date_to):
+    """Returns every 'YYYY-MM-DD' day from date_from to date_to inclusive."""
+    return list(_leave_days(date_from, date_to))
+
+@timed
+@cached_query
+def get_absent_employees(day):
+    """Returns the employees on approved leave on day ('YYYY-MM-DD'), by name, with the covering leave_id."""
+    with connection() as conn:
+        return conn.execute('SELECT a.emp_id, a.leave_id, e.name FROM daily_absences a '
+                            'JOIN employees e ON e.emp_id = a.emp_id WHERE a.day = ? ORDER BY e.name',
+                            (day,)).fetchall()
+
+@timed
+@cached_query
+def count_absences(date_from, date_to):
+    """Returns [(day, employees absent)] for every day from date_from to date_to inclusive, zeros included."""
+    with connection() as conn:
+        counts = dict(conn.execute('SELECT day, absent FROM absence_counts WHERE day BETWEEN ? AND ?',
+                                   (date_from, date_to)).fetchall())
+    return [(day, counts.get(day, 0)) for day in _date_range(date_from, date_to)]
+
+@timed
+@cached_query
+def total_absence_days(date_from, date_to):
+    """Returns the number of employee-days of approved leave from date_from to date_to inclusive."""
+    with connection() as conn:
+        return conn.execute('SELECT COALESCE(SUM(absent), 0) FROM absence_counts WHERE day BETWEEN ? AND ?',
+                            (date_from, date_to)).fetchone()[0]
+
+@timed
+@cached_query
+def absence_matrix(date_from, date_to, emp_ids=None):
+    """
+    Returns (emp_ids, days, matrix) where matrix is a NumPy bool array of employees x days that is True
+    where the employee is on approved leave. emp_ids, if given, is a tuple fixing the rows; otherwise
+    the rows are the employees absent at least once in the range, by ID. Aggregates over the matrix are
+    vectorized, e.g. matrix.sum(axis=0) is the count per day and 1 - matrix.mean(axis=0) the team's
+    availability. Requires NumPy.
+    """
+    import numpy as np
+
+    days = np.array(_date_range(date_from, date_to), dtype='datetime64[D]')
+    query = 'SELECT day, emp_id FROM daily_absences WHERE day BETWEEN ? AND ?'
+    params = [date_from, date_to]
+    if emp_ids is not None:
+        query += f" AND emp_id IN ({', '.join('?' for _ in emp_ids)})"
+        params += list(emp_ids)
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    absent_days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    absent_emps = np.array([row[1] for row in rows], dtype=np.int64)
+    ids = np.unique(absent_emps) if emp_ids is None else np.array(emp_ids, dtype=np.int64)
+    matrix = np.zeros((len(ids), len(days)), dtype=bool)
+    if len(rows):
+        # Map each absence to its row (ids may be in caller order) and its column (days since date_from)
+        order = np.argsort(ids)
+        matrix[order[np.searchsorted(ids, absent_emps, sorter=order)], (absent_days - days[0]).astype(np.int64)] = True
+    return ids, days, matrix
+
+@timed
+@cached_query
+def team_calendar(date_from, date_to, page_size, after=None):
+    """
+    One page of the absence matrix as a pandas DataFrame for the Manager Portal: one row per employee
+    absent in the range, by name, one column per day, "Out" where the employee is on leave.
+    after is the keyset cursor (name, emp_id) of the previous page's last row. Returns
+    (calendar, next_cursor); next_cursor is None on the last page. Cached, so portal reruns issue no
+    SQL; the frame is shared between callers and must not be modified.
+    """
+    import numpy as np
+    import pandas as pd
+
+    query = ('SELECT e.emp_id, e.name FROM employees e '
+             'WHERE e.emp_id IN (SELECT emp_id FROM daily_absences WHERE day BETWEEN ? AND ?)')
+    params = [date_from, date_to]
+    if after is not None:
+        query += ' AND (e.name, e.emp_id) > (?, ?)'
+        params += list(after)
+    query += ' ORDER BY e.name, e.emp_id LIMIT ?'
+    params.append(page_size + 1)
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    next_cursor = (rows[page_size - 1]['name'], rows[page_size - 1]['emp_id']) if len(rows) > page_size else None
+    rows = rows[:page_size]
+
+    ids, days, matrix = absence_matrix(date_from, date_to, tuple(row[0] for row in rows))
+    calendar = pd.DataFrame(np.where(matrix, "Out", ""), index=[row[1] for row in rows],
+                            columns=[str(day)[5:] for day in days])
+    return calendar, next_cursor
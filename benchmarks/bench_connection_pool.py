@@ -0,0 +1,103 @@
+"""
+Connection pool benchmark.
+
+Seeds a populated database, then replays the read helpers used by one Employee and one
+Manager portal render ("a request") and reports requests/sec for:
+
+  * before - a fresh sqlite3 connection per helper call, default pragmas
+  * after  - the shared pool from database.py (long-lived, tuned connections)
+
+Run from the repository root:
+
+    python -m benchmarks.bench_connection_pool --employees 2000 --requests 200000
+"""
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_pool.db")
+
+import leave_service  # noqa: E402  (must be imported after use_database)
+import query_cache  # noqa: E402
+
+# Measure the connection layer, not the read-through cache: expire cached results immediately
+query_cache.CACHE_TTL = 0
+
+
+def seed(num_employees, num_requests):
+    """Creates a fresh benchmark database with the given number of employees and leave requests."""
+    reset_database()
+    seed_history(num_employees, num_requests)
+
+
+@contextmanager
+def unpooled_connection(db_name=None):
+    """The pre-pool behaviour: open, use and close a default connection for every call."""
+    conn = sqlite3.connect(db_name or DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def render(emp_id, manager_id):
+    """The read helpers issued by one Employee portal render plus one Manager portal render."""
+    leave_service.get_employees(role="employee")
+    leave_service.get_employee(emp_id)
+    leave_service.get_leave_requests_page(20, emp_id=emp_id)
+    leave_service.get_employees(role="manager")
+    leave_service.get_employee(manager_id)
+    leave_service.get_employees()
+    leave_service.count_leave_requests(status="pending")
+    leave_service.get_leave_requests_page(20, status="pending")
+
+
+def run(num_renders, threads, employee_ids, manager_ids):
+    """Runs num_renders portal renders spread over the given number of threads; returns renders/sec."""
+    per_thread = num_renders // threads
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        for _ in range(per_thread):
+            render(rng.choice(employee_ids), rng.choice(manager_ids))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200000, help="leave requests to seed")
+    parser.add_argument("--renders", type=int, default=200, help="portal renders per measurement")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    seed(args.employees, args.requests)
+    print(f"Seeded {args.employees} employees and {args.requests} leave requests into {DB_PATH}")
+    print(f"{'mode':<8} {'threads':>7} {'renders/sec':>12}")
+    employee_ids = [e['emp_id'] for e in leave_service.get_employees(role="employee")]
+    manager_ids = [m['emp_id'] for m in leave_service.get_employees(role="manager")]
+    pooled_connection = leave_service.connection
+    for threads in args.threads:
+        leave_service.connection = unpooled_connection
+        before = run(args.renders, threads, employee_ids, manager_ids)
+        leave_service.connection = pooled_connection
+        after = run(args.renders, threads, employee_ids, manager_ids)
+        print(f"{'before':<8} {threads:>7} {before:>12.1f}")
+        print(f"{'after':<8} {threads:>7} {after:>12.1f}   ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+CSV export benchmark: the original fetchall() + per-row strptime + DataFrame path ("legacy")
+against the streaming exporter in check_employee_leave.py ("streaming").
+
+Each mode runs in its own subprocess so peak RSS is measured independently, and the two output
+files are compared byte for byte. Note that peak RSS includes database pages read through the
+pool's mmap (file-backed and reclaimable, capped by mmap_size in database.py).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_export --requests 1000000
+"""
+import argparse
+import filecmp
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_export.db")
+
+import database  # noqa: E402  (must be imported after use_database)
+
+
+def legacy_export(output_path):
+    """The export as it was before streaming: everything is held in memory three times over."""
+    import pandas as pd
+    from check_employee_leave import LEAVE_HISTORY_QUERY, ORDERED_COLUMNS
+    # The original query, without the SQL-side duration and newline handling
+    query = LEAVE_HISTORY_QUERY.replace(
+        "COALESCE(CAST(julianday(lr.end_date) - julianday(lr.start_date) + 1 AS INTEGER), 'N/A') AS NumberOfDays,",
+        "").replace("REPLACE(lr.leave_reason, char(10), ' ')", "lr.leave_reason")
+    with database.connection() as conn:
+        rows = conn.execute(query).fetchall()
+    data_for_df = []
+    for row in rows:
+        row_dict = dict(row)
+        if row_dict['ReasonForLeave'] is not None:
+            row_dict['ReasonForLeave'] = row_dict['ReasonForLeave'].replace('\n', ' ')
+        try:
+            start_date = datetime.strptime(row_dict['LeaveStartDate'], "%Y-%m-%d")
+            end_date = datetime.strptime(row_dict['LeaveEndDate'], "%Y-%m-%d")
+            row_dict['NumberOfDays'] = (end_date - start_date).days + 1
+        except (ValueError, TypeError):
+            row_dict['NumberOfDays'] = "N/A"
+        data_for_df.append(row_dict)
+    df = pd.DataFrame(data_for_df)
+    df[ORDERED_COLUMNS].to_csv(output_path, index=False)
+
+
+def streaming_export(output_path):
+    from check_employee_leave import export_employee_leave_history_to_csv
+    export_employee_leave_history_to_csv(output_path)
+
+
+MODES = {"legacy": legacy_export, "streaming": streaming_export}
+
+
+def run_one(mode, output_path):
+    """Runs one export in this process and prints its timing and peak RSS as JSON."""
+    started = time.perf_counter()
+    MODES[mode](output_path)
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["legacy", "streaming"])
+    parser.add_argument("--run", choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.output)
+        return
+
+    reset_database()
+    seed_history(args.employees, args.requests)
+    database.close_pools()
+    print(f"Seeded {args.employees} employees and {args.requests} leave requests into {DB_PATH}")
+    outputs = {}
+    print(f"{'mode':<10} {'seconds':>8} {'peak RSS MB':>12}")
+    for mode in args.modes:
+        outputs[mode] = os.path.join(tempfile.gettempdir(), f"leave_bench_export_{mode}.csv")
+        result = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--run", mode,
+                                 "--output", outputs[mode]], capture_output=True, text=True, check=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:<10} {stats['seconds']:>8.2f} {stats['peak_rss_mb']:>12.1f}")
+    if len(outputs) == 2:
+        same = filecmp.cmp(*outputs.values(), shallow=False)
+        print("Outputs identical." if same else "Outputs DIFFER.")
+
+
+if __name__ == "__main__":
+    main()
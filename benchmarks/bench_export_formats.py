@@ -0,0 +1,79 @@
+"""
+Export format benchmark: CSV vs typed Parquet vs Arrow IPC (Feather) datasets.
+
+Reports export time, size on disk and the time for a downstream consumer to load the export
+into a typed DataFrame (for CSV that includes re-parsing the date and timestamp columns).
+
+Run from the repository root (requires pyarrow):
+
+    python -m benchmarks.bench_export_formats --requests 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+use_database("leave_bench_formats.db")
+
+import pandas as pd  # noqa: E402
+import pyarrow.dataset as ds  # noqa: E402
+
+import check_employee_leave as exporter  # noqa: E402  (must be imported after use_database)
+
+OUTPUT_DIR = tempfile.gettempdir()
+CSV_DATE_COLUMNS = ['LeaveStartDate', 'LeaveEndDate', 'DateApplied', 'DateProcessed']
+
+
+def disk_size(path):
+    """Total size in bytes of a file or of every file under a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def load_csv(path):
+    df = pd.read_csv(path, dtype={'EmployeeRole': 'category', 'LeaveStatus': 'category'})
+    for column in CSV_DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce')
+    df['NumberOfDays'] = pd.to_numeric(df['NumberOfDays'], errors='coerce').astype('Int32')
+    return df
+
+
+def load_dataset(arrow_format):
+    return lambda path: ds.dataset(path, format=arrow_format, partitioning='hive').to_table().to_pandas()
+
+
+FORMATS = {
+    'csv': (lambda path: exporter.export_employee_leave_history_to_csv(path), load_csv, "bench.csv"),
+    'parquet': (lambda path: exporter.export_leave_history_columnar(path, 'parquet'),
+                load_dataset('parquet'), "bench.parquet"),
+    'feather': (lambda path: exporter.export_leave_history_columnar(path, 'feather'),
+                load_dataset('ipc'), "bench.arrow"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000000)
+    args = parser.parse_args()
+
+    reset_database()
+    seed_history(args.employees, args.requests)
+    print(f"Seeded {args.employees} employees and {args.requests} leave requests")
+    print(f"{'format':<8} {'export s':>9} {'size MB':>8} {'load s':>7} {'rows':>9}")
+    for name, (export, load, file_name) in FORMATS.items():
+        path = os.path.join(OUTPUT_DIR, f"leave_{file_name}")
+        started = time.perf_counter()
+        export(path)
+        exported = time.perf_counter() - started
+        started = time.perf_counter()
+        rows = len(load(path))
+        loaded = time.perf_counter() - started
+        print(f"{name:<8} {exported:>9.2f} {disk_size(path) / 2**20:>8.1f} {loaded:>7.2f} {rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
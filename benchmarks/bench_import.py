@@ -0,0 +1,73 @@
+"""
+Bulk import benchmark: exports a seeded leave history to CSV, then imports that file into an empty
+database with bulk_import.import_csv and reports rows/sec against a target of 100k rows/sec.
+
+The synthetic history contains a small share of deliberately overlapping requests (generate_data's
+overlap rate). generate_data stores them as rejected requests, which never clash, so no rows should be
+reported as rejected. The imported database is checked afterwards: the ledger must agree with the
+balances (leave_ledger.verify_balances) and the absence index must match a rebuild. A second pass
+re-imports the same file over the loaded data (the update path of the upserts, where unchanged rows are
+skipped).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import --requests 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_import.db")
+
+import database  # noqa: E402  (must be imported after use_database)
+from absence import rebuild_absences  # noqa: E402
+from bulk_import import IMPORT_CHUNK_SIZE, import_csv  # noqa: E402
+from check_employee_leave import export_employee_leave_history_to_csv  # noqa: E402
+from leave_ledger import verify_balances  # noqa: E402
+
+TARGET_ROWS_PER_SEC = 100000
+
+
+def absence_snapshot():
+    """The absence index as a comparable set of rows."""
+    with database.connection() as conn:
+        return set(conn.execute('SELECT day, emp_id, leave_id FROM daily_absences').fetchall()), \
+            set(conn.execute('SELECT day, absent FROM absence_counts').fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    reset_database()
+    seed_history(args.employees, args.requests)
+    csv_path = os.path.join(tempfile.gettempdir(), "leave_bench_import.csv")
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_employee_leave_history_to_csv(csv_path)
+    print(f"Exported {args.requests} leave requests of {args.employees} employees to {csv_path}")
+
+    reset_database()
+    print(f"{'pass':<10} {'rows':>9} {'rejected':>9} {'seconds':>8} {'rows/sec':>10}")
+    for name in ("fresh", "re-import"):
+        result = import_csv(csv_path, chunk_size=args.chunk_size)
+        rate = result['rows'] / result['seconds']
+        print(f"{name:<10} {result['rows']:>9} {result['rejected']:>9} {result['seconds']:>8.2f} {rate:>10.0f}"
+              f"  {'meets' if rate >= TARGET_ROWS_PER_SEC else 'below'} target")
+
+    problems = verify_balances()
+    indexed = absence_snapshot()
+    with database.transaction() as conn:
+        rebuild_absences(conn)
+    print(f"ledger: {'consistent' if not problems else f'{len(problems)} inconsistencies'}; "
+          f"absence index: {'matches a rebuild' if indexed == absence_snapshot() else 'DIFFERS from a rebuild'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Parallel CSV export benchmark: the serial streaming exporter against export_leave_history_parallel
+with an increasing number of worker processes.
+
+Every parallel run's merged file is compared byte for byte with the serial export, and the speed-up
+over the serial run is printed per worker count. Scaling is bounded by the number of cores and by
+the final concatenation, which is a sequential copy. On a single core there is nothing to gain: the
+workers only add process start-up, per-partition queries and the copy (1M requests on 1 CPU:
+serial 20.2s, 1 worker 21.3s, 2 workers 22.3s, 4 workers 25.5s), so measure on the target machine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel_export --requests 1000000 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_parallel_export.db")
+
+import database  # noqa: E402  (must be imported after use_database)
+from check_employee_leave import export_employee_leave_history_to_csv, export_leave_history_parallel  # noqa: E402
+
+
+def timed_run(func, *args):
+    """Runs one export with its messages suppressed and returns its wall time in seconds."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    reset_database()
+    seed_history(args.employees, args.requests)
+    database.close_pools()
+    print(f"Seeded {args.employees} employees and {args.requests} leave requests into {DB_PATH} "
+          f"({os.cpu_count()} CPUs)")
+    if (os.cpu_count() or 1) < 2:
+        print("Warning: one CPU; the parallel runs can only measure their overhead, not a speed-up")
+
+    serial_path = os.path.join(tempfile.gettempdir(), "leave_bench_parallel_serial.csv")
+    serial = timed_run(export_employee_leave_history_to_csv, serial_path)
+    print(f"{'mode':<12} {'seconds':>8} {'rows/sec':>10} {'speed-up':>9}  output")
+    print(f"{'serial':<12} {serial:>8.2f} {args.requests / serial:>10.0f} {1:>8.2f}x")
+    for workers in sorted(set(args.workers)):
+        path = os.path.join(tempfile.gettempdir(), f"leave_bench_parallel_{workers}.csv")
+        seconds = timed_run(export_leave_history_parallel, path, workers)
+        same = filecmp.cmp(serial_path, path, shallow=False)
+        print(f"{f'{workers} workers':<12} {seconds:>8.2f} {args.requests / seconds:>10.0f} "
+              f"{serial / seconds:>8.2f}x  {'identical' if same else 'DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Writer latency during a large export: apply_leave + approve_leave are called in a loop (as the portal
+does) while check_employee_leave.py runs a full CSV export in a separate process, first against the
+live database and then with --snapshot, plus a baseline of equal length with no export running.
+
+For every phase it prints the writes' latency percentiles and the largest WAL size seen. A live
+export holds one read transaction for its whole run, so checkpoints cannot recycle the WAL and it
+grows with every write; the snapshot export holds one only while the sqlite3 backup copies the
+pages. With snapshots the writers' p95/p99 should stay close to the baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_snapshot_export --requests 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_snapshot.db")
+os.environ["LEAVE_SNAPSHOT_PATH"] = os.path.join(tempfile.gettempdir(), "leave_bench_snapshot.snapshot.db")
+
+import database  # noqa: E402  (must be imported after use_database)
+import leave_service  # noqa: E402
+import query_cache  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Writer:
+    """Applies for and approves one-day leaves in a loop on a background thread, timing each pair."""
+
+    def __init__(self, employees, manager):
+        self.employees = employees
+        self.manager = manager
+        self.calls = 0
+        self.latencies = []
+        self.wal_peak = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Start each phase from an empty WAL, so wal_peak is what the phase itself let accumulate
+        with database.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.latencies, self.wal_peak = [], 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the loop and returns (latencies, wal_peak); re-raises the error that ended it early, if any."""
+        self._stop.set()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.latencies, self.wal_peak
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            self.error = e
+
+    def _write_loop(self):
+        first_day = date.today() + timedelta(days=400)
+        while not self._stop.is_set():
+            # Each employee gets the next free day, so no request overlaps another
+            emp_id = self.employees[self.calls % len(self.employees)]
+            day = (first_day + timedelta(days=self.calls // len(self.employees))).isoformat()
+            self.calls += 1
+            started = time.perf_counter()
+            success, message = leave_service.apply_leave(emp_id, day, day, "Benchmark")
+            if not success:
+                raise RuntimeError(f"apply_leave failed for employee {emp_id}: {message}")
+            with database.connection() as conn:
+                leave_id = conn.execute("SELECT MAX(leave_id) FROM leave_requests WHERE emp_id = ?", (emp_id,)).fetchone()[0]
+            success, message = leave_service.approve_leave(self.manager, leave_id)
+            if not success:
+                raise RuntimeError(f"approve_leave failed for leave {leave_id}: {message}")
+            self.latencies.append(time.perf_counter() - started)
+            if os.path.exists(DB_PATH + "-wal"):
+                self.wal_peak = max(self.wal_peak, os.path.getsize(DB_PATH + "-wal"))
+            time.sleep(0.005)
+
+
+def run_export(snapshot):
+    """Runs a full CSV export in a separate process (as the CLI would next to the app); returns its wall time."""
+    command = [sys.executable, "check_employee_leave.py", "--full",
+               "--output", os.path.join(tempfile.gettempdir(), "leave_bench_snapshot.csv")]
+    if snapshot:
+        command.append("--snapshot")
+    started = time.perf_counter()
+    # LEAVE_SNAPSHOT_MAX_AGE=0 retakes the snapshot, so its copy is part of the measured run
+    subprocess.run(command, cwd=ROOT, env={**os.environ, "LEAVE_SNAPSHOT_MAX_AGE": "0"},
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def prepare_writers(count):
+    """
+    Picks the manager and `count` employees for the Writer. Clears their pending requests and tops
+    up their balances, so every apply and approve takes the success path (one pending request,
+    enough balance). Returns (employees, manager).
+    """
+    manager = leave_service.get_employees(role="manager")[0]['emp_id']
+    employees = [e['emp_id'] for e in leave_service.get_employees(role="employee")][:count]
+    with database.connection() as conn:
+        pending = [row[0] for row in conn.execute(
+            f"SELECT leave_id FROM leave_requests WHERE status = 'pending' "
+            f"AND emp_id IN ({', '.join('?' for _ in employees)})", employees)]
+    leave_service.reject_leaves(manager, pending)
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on) "
+                         "VALUES (?, ?, 'adjustment', 10000, 'Benchmark top-up', ?)",
+                         [(emp_id, date.today().year, date.today().isoformat()) for emp_id in employees])
+    return employees, manager
+
+
+def run_phases(writer):
+    """
+    Runs the live export and the snapshot export with the writer going, then a baseline as long as the
+    live export with no export running. Returns {phase: (seconds, latencies, wal_peak)}.
+    """
+    results = {}
+    for name, snapshot in (("live export", False), ("snapshot export", True)):
+        writer.start()
+        seconds = run_export(snapshot)
+        results[name] = (seconds, *writer.stop())
+    writer.start()
+    time.sleep(results["live export"][0])
+    results["no export"] = (results["live export"][0], *writer.stop())
+    return results
+
+
+def report(name, seconds, latencies, wal_peak):
+    ms = np.array(latencies) * 1000
+    print(f"{name:<16} {seconds:>8.1f} {len(ms):>7} {np.percentile(ms, 50):>8.2f} {np.percentile(ms, 95):>8.2f} "
+          f"{np.percentile(ms, 99):>8.2f} {ms.max():>8.1f} {wal_peak / 2**20:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--writers", type=int, default=200, help="employees the writer cycles through")
+    args = parser.parse_args()
+
+    reset_database()
+    seed_history(args.employees, args.requests)
+    query_cache.CACHE_TTL = 0
+    employees, manager = prepare_writers(args.writers)
+    print(f"Seeded {args.employees} employees and {args.requests} leave requests into {DB_PATH}")
+
+    print(f"{'phase':<16} {'seconds':>8} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'WAL MiB':>9}")
+    results = run_phases(Writer(employees, manager))
+    for name in ("no export", "live export", "snapshot export"):
+        report(name, *results[name])
+
+
+if __name__ == "__main__":
+    main()
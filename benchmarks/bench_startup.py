@@ -0,0 +1,112 @@
+"""
+Startup benchmark: cold start and warm reruns of the Streamlit app.
+
+Each scenario runs in a fresh subprocess, so the cold numbers include every import main.py pulls in.
+The database starts out as:
+
+  * missing   - no database file (tables are created and demo data seeded)
+  * empty     - an existing but empty (0 byte) database file
+  * populated - a database that already has employees (the usual case)
+
+Reported per scenario: process wall time until the first run finished, the first script run on its
+own, the median/p95 of the warm reruns, the time the start-up helpers (migrate, is_data_initialized,
+initialize_data, bootstrap) still take per warm rerun, and whether Faker got imported.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --reruns 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_startup.db")
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+SCENARIOS = ("missing", "empty", "populated")
+
+# Helpers whose time counts as start-up work (see instrumentation.timed)
+STARTUP_FUNCTIONS = ("migrate", "is_data_initialized", "initialize_data", "bootstrap")
+
+
+def run_app(reruns):
+    """Runs in the child process: one cold run of main.py followed by warm reruns."""
+    import numpy as np
+    from streamlit.testing.v1 import AppTest
+
+    import instrumentation
+    instrumentation.set_enabled(True)
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    instrumentation.reset_metrics()
+    warm = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - started)
+    warm_ms = np.array(warm) * 1000
+    functions = instrumentation.metrics()['functions']
+    # bootstrap() wraps the other helpers; without it they are called one after another by main.py
+    if "bootstrap" in functions:
+        startup = functions["bootstrap"]['seconds']
+    else:
+        startup = sum(functions[name]['seconds'] for name in STARTUP_FUNCTIONS if name in functions)
+    return {
+        "first_run_ms": round(first_run * 1000, 1),
+        "warm_p50_ms": round(float(np.percentile(warm_ms, 50)), 2),
+        "warm_p95_ms": round(float(np.percentile(warm_ms, 95)), 2),
+        "startup_ms_per_rerun": round(startup * 1000 / max(reruns, 1), 3),
+        "faker_imported": "faker" in sys.modules,
+    }
+
+
+def prepare(scenario):
+    """Puts the scratch database into the state the scenario starts from."""
+    import database
+    reset_database()
+    if scenario == "populated":
+        seed_history(50, 1000)
+    database.close_pools()
+    if scenario in ("missing", "empty"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+    if scenario == "empty":
+        open(DB_PATH, "w").close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=50)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_app(args.reruns)))
+        return
+
+    for scenario in SCENARIOS:
+        prepare(scenario)
+        started = time.perf_counter()
+        child = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--run", "--reruns", str(args.reruns)],
+                               capture_output=True, text=True, check=True)
+        wall = time.perf_counter() - started
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{scenario:<10} process {wall:6.2f}s  first run {result['first_run_ms']:8.1f} ms  "
+              f"warm p50 {result['warm_p50_ms']:7.2f} ms  p95 {result['warm_p95_ms']:7.2f} ms  "
+              f"start-up per rerun {result['startup_ms_per_rerun']:6.3f} ms  "
+              f"faker imported: {result['faker_imported']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Shared helpers for the benchmark scripts.
+
+use_database() must be called before database.py is imported (directly or through
+leave_service / migrations), because database.DB_NAME is read from LEAVE_DB_NAME at import time.
+"""
+import os
+import tempfile
+
+
+def use_database(file_name):
+    """Points LEAVE_DB_NAME at a scratch database in the temp directory and returns its path."""
+    path = os.path.join(tempfile.gettempdir(), file_name)
+    os.environ["LEAVE_DB_NAME"] = path
+    return path
+
+
+def reset_database():
+    """Deletes the scratch database (and its WAL files) and recreates the current schema."""
+    import database
+    import migrations
+    database.close_pools()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database.DB_NAME + suffix):
+            os.remove(database.DB_NAME + suffix)
+    migrations.migrate()
+
+
+def seed_history(num_employees, num_requests, seed=42):
+    """Fills the scratch database with reproducible synthetic data (see generate_data.generate)."""
+    import generate_data
+    generate_data.generate(num_employees, num_requests, seed=seed, append=True)
@@ -0,0 +1,203 @@
+"""
+Benchmark suite: latency percentiles and throughput for the core operations at several data scales.
+
+For every scale (number of leave requests) a fresh database is generated and the suite measures:
+
+  * apply_leave, approve_leave
+  * get_leave_requests (pending-queue page, employee-history page, full employee history)
+  * the streaming CSV export
+  * a full simulated Streamlit rerun of each portal (cold, then warm), if streamlit is installed
+
+Function timings run with the read-through cache disabled so they measure SQLite; portal reruns
+run with it enabled, as in production. Results are written as JSON; pass --compare with an earlier
+results file to print the change per metric.
+
+Run from the repository root:
+
+    python -m benchmarks.run_suite --scales 1000 100000 1000000
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from benchmarks.common import reset_database, seed_history, use_database
+
+DB_PATH = use_database("leave_bench_suite.db")
+
+import check_employee_leave  # noqa: E402  (must be imported after use_database)
+import database  # noqa: E402
+import leave_service  # noqa: E402
+import query_cache  # noqa: E402
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def summarize(latencies):
+    """Latency percentiles in milliseconds and throughput for a list of per-call durations in seconds."""
+    ms = np.array(latencies) * 1000
+    return {
+        "n": len(latencies),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "ops_per_sec": round(len(latencies) / (ms.sum() / 1000), 1),
+    }
+
+
+def timed(func, calls):
+    """Runs func(*args) for each args tuple in calls and returns the per-call durations."""
+    latencies = []
+    for args in calls:
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def bench_functions(samples):
+    """Measures the service functions on the current database."""
+    query_cache.CACHE_TTL = 0
+    results = {}
+    managers = [m['emp_id'] for m in leave_service.get_employees(role="manager")]
+    employees = [e['emp_id'] for e in leave_service.get_employees(role="employee")]
+    rng = np.random.default_rng(0)
+    sample = [int(e) for e in rng.choice(employees, size=min(samples, len(employees)), replace=False)]
+
+    # Clear each sampled employee's pending requests and top up their balance, so every apply and
+    # approve below takes the success path (one pending request, enough balance, no overlap).
+    with database.connection() as conn:
+        pending = [row[0] for row in conn.execute(
+            f"SELECT leave_id FROM leave_requests WHERE status = 'pending' "
+            f"AND emp_id IN ({', '.join('?' for _ in sample)})", sample)]
+    leave_service.reject_leaves(managers[0], pending)
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on) "
+                         "SELECT emp_id, ?, 'adjustment', ? - leave_balance, 'Benchmark top-up', ? "
+                         "FROM employees WHERE emp_id = ?",
+                         [(date.today().year, leave_service.MAX_LEAVE_PER_YEAR, date.today().isoformat(), emp_id)
+                          for emp_id in sample])
+
+    future = (date.today() + timedelta(days=400)).isoformat()
+    results["apply_leave"] = summarize(timed(leave_service.apply_leave,
+                                             [(emp_id, future, future, "Benchmark") for emp_id in sample]))
+    with database.connection() as conn:
+        new_leaves = [row[0] for row in conn.execute(
+            "SELECT leave_id FROM leave_requests WHERE start_date = ? AND leave_reason = 'Benchmark'", (future,))]
+    results["approve_leave"] = summarize(timed(
+        leave_service.approve_leave, [(managers[i % len(managers)], leave_id) for i, leave_id in enumerate(new_leaves)]))
+
+    results["get_leave_requests.pending_page"] = summarize(timed(
+        lambda: leave_service.get_leave_requests_page(20, status="pending"), [()] * samples))
+    results["get_leave_requests.history_page"] = summarize(timed(
+        lambda emp_id: leave_service.get_leave_requests_page(20, emp_id=emp_id), [(e,) for e in sample]))
+    results["get_leave_requests.full_history"] = summarize(timed(
+        lambda emp_id: leave_service.get_leave_requests(emp_id=emp_id), [(e,) for e in sample]))
+    return results
+
+
+def bench_export(num_requests):
+    """Times one full streaming CSV export."""
+    output = os.path.join(tempfile.gettempdir(), "leave_bench_suite.csv")
+    started = time.perf_counter()
+    check_employee_leave.export_employee_leave_history_to_csv(output)
+    elapsed = time.perf_counter() - started
+    return {"n": 1, "seconds": round(elapsed, 3), "rows_per_sec": round(num_requests / elapsed, 1)}
+
+
+def bench_portals(reruns):
+    """Times full script runs of each portal with streamlit's AppTest: the first (cold) run and warm reruns."""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {}
+    query_cache.CACHE_TTL = 30
+    query_cache.clear_cache()
+    results = {}
+    for portal in ("Employee", "Manager"):
+        at = AppTest.from_file(MAIN_SCRIPT, default_timeout=120)
+        if portal != "Employee":
+            at.run()
+            at.sidebar.selectbox[0].select(portal)
+        query_cache.clear_cache()
+        cold = timed(at.run, [()])
+        warm = timed(at.run, [()] * reruns)
+        results[f"portal.{portal.lower()}.cold"] = summarize(cold)
+        results[f"portal.{portal.lower()}.warm"] = summarize(warm)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    """Prints the p50 (or export seconds) change of every metric against an earlier results file."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} ({previous.get('git_commit')}):")
+    for scale, metrics in current["scales"].items():
+        for name, stats in metrics.items():
+            old = previous.get("scales", {}).get(scale, {}).get(name)
+            key = "p50_ms" if "p50_ms" in stats else "seconds"
+            if old and old.get(key):
+                print(f"  {scale:>8} {name:<34} {old[key]:>10.3f} -> {stats[key]:>10.3f}  "
+                      f"({stats[key] / old[key]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--samples", type=int, default=200, help="calls per measured function")
+    parser.add_argument("--reruns", type=int, default=20, help="warm reruns per portal")
+    parser.add_argument("--output", default=os.path.join(
+        "benchmarks", f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    for scale in args.scales:
+        num_employees = max(50, scale // 200)
+        reset_database()
+        seed_history(num_employees, scale)
+        print(f"Scale {scale}: {num_employees} employees")
+        metrics = bench_functions(args.samples)
+        metrics["export_csv"] = bench_export(scale)
+        metrics.update(bench_portals(args.reruns))
+        for name, stats in metrics.items():
+            if "p50_ms" in stats:
+                print(f"  {name:<34} p50 {stats['p50_ms']:>9.3f} ms  p95 {stats['p95_ms']:>9.3f} ms  "
+                      f"p99 {stats['p99_ms']:>9.3f} ms  {stats['ops_per_sec']:>9.1f} ops/s")
+            else:
+                print(f"  {name:<34} {stats['seconds']:>9.3f} s  {stats['rows_per_sec']:>12.1f} rows/s")
+        report["scales"][str(scale)] = metrics
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Concurrency stress test for approve_leave / reject_leave.
+
+Seeds employees that each have one pending leave request, then lets several workers (threads
+or processes) race through every request in random order, approving or rejecting it as
+different managers. Afterwards it checks that:
+
+  * every request was processed at most once (successful calls == processed requests), and
+  * every balance equals the starting balance minus the days of its approved leave, never < 0, and
+    matches the total of the employee's leave ledger.
+
+Run from the repository root:
+
+    python -m benchmarks.stress_approvals --workers 8 --mode process
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.common import reset_database, use_database
+
+DB_PATH = use_database("leave_bench_stress.db")
+
+import database  # noqa: E402  (must be imported after use_database)
+import leave_ledger  # noqa: E402
+import leave_service  # noqa: E402
+
+STARTING_BALANCE = 10
+MANAGERS = 4
+
+
+def seed(num_employees):
+    """Creates a fresh database with MANAGERS managers and one pending request per employee."""
+    reset_database()
+    rng = random.Random(7)
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, 0)",
+                         [(f"Manager {i}", "manager") for i in range(MANAGERS)])
+        conn.executemany("INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, 0)",
+                         [(f"Employee {i:06d}", "employee") for i in range(num_employees)])
+        start = date.today() + timedelta(days=30)
+        # Starting balances are ledger accruals, so the ledger can be verified afterwards as well
+        conn.execute("INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on) "
+                     "SELECT emp_id, ?, 'accrual', ?, 'Stress', ? FROM employees",
+                     (start.year, STARTING_BALANCE, start.isoformat()))
+        # Some requests are longer than the balance, so the insufficient-balance path is exercised too
+        conn.executemany(
+            "INSERT INTO leave_requests (emp_id, start_date, end_date, leave_reason, status, applied_on) "
+            "VALUES (?, ?, ?, ?, 'pending', ?)",
+            [(MANAGERS + i + 1, start.isoformat(), (start + timedelta(days=rng.randrange(14))).isoformat(),
+              "Stress", start.isoformat()) for i in range(num_employees)])
+    with database.connection() as conn:
+        return [row[0] for row in conn.execute("SELECT leave_id FROM leave_requests")]
+
+
+def worker(worker_id, leave_ids):
+    """Approves (80%) or rejects every leave id in a worker-specific random order; returns message counts."""
+    rng = random.Random(worker_id)
+    leave_ids = list(leave_ids)
+    rng.shuffle(leave_ids)
+    counts = Counter()
+    for leave_id in leave_ids:
+        manager_id = rng.randint(1, MANAGERS)
+        if rng.random() < 0.8:
+            success, msg = leave_service.approve_leave(manager_id, leave_id)
+        else:
+            success, msg = leave_service.reject_leave(manager_id, leave_id)
+        counts[msg] += 1
+    return counts
+
+
+def verify(successes):
+    """Checks the invariants described in the module docstring; returns a list of problems."""
+    problems = []
+    with database.connection() as conn:
+        processed = conn.execute("SELECT COUNT(*) FROM leave_requests WHERE status != 'pending'").fetchone()[0]
+        if processed != successes:
+            problems.append(f"{successes} successful calls but {processed} processed requests")
+        rows = conn.execute('''
+            SELECT e.emp_id, e.leave_balance,
+                   COALESCE(SUM(CASE WHEN lr.status = 'approved'
+                       THEN julianday(lr.end_date) - julianday(lr.start_date) + 1 END), 0) AS approved_days
+            FROM employees e LEFT JOIN leave_requests lr ON lr.emp_id = e.emp_id
+            WHERE e.role = 'employee'
+            GROUP BY e.emp_id
+        ''').fetchall()
+    for row in rows:
+        if row['leave_balance'] < 0 or row['leave_balance'] != STARTING_BALANCE - row['approved_days']:
+            problems.append(f"employee {row['emp_id']}: balance {row['leave_balance']}, "
+                            f"approved days {row['approved_days']:.0f}")
+    return problems + leave_ledger.verify_balances()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    leave_ids = seed(args.employees)
+    database.close_pools()
+    started = time.perf_counter()
+    if args.mode == "process":
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            results = pool.starmap(worker, [(i, leave_ids) for i in range(args.workers)])
+    else:
+        results = [None] * args.workers
+
+        def run(i):
+            results[i] = worker(i, leave_ids)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(args.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+
+    totals = sum(results, Counter())
+    calls = sum(totals.values())
+    successes = totals["Leave approved."] + totals["Leave rejected"]
+    print(f"{args.workers} {args.mode} workers, {len(leave_ids)} requests, {calls} calls in {elapsed:.2f}s "
+          f"({calls / elapsed:.0f} calls/sec)")
+    for msg, count in totals.most_common():
+        print(f"  {count:>8}  {msg}")
+    problems = verify(successes)
+    for problem in problems[:20]:
+        print(f"INCONSISTENT: {problem}")
+    print("Balances consistent." if not problems else f"{len(problems)} inconsistencies found.")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
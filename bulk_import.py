@@ -0,0 +1,475 @@
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from absence import index_leaves, rebuild_absences, unindex_leaves
+from database import connection
+from instrumentation import timed
+from leave_overlap import ACTIVE_STATUSES
+from leave_service import MAX_LEAVE_PER_YEAR
+from migrations import migrate
+from query_cache import bump_data_version
+
+# --- Constants ---
+# CSV rows staged per executemany(), and staged rows merged per write transaction
+IMPORT_CHUNK_SIZE = 50000
+# Page cache (KiB) of the importing connection, for the database and for its TEMP staging tables: the
+# leave_requests indexes are updated in random key order, which thrashes the pool's smaller default cache
+IMPORT_CACHE_KIB = 131072
+
+ROLES = ('employee', 'manager')
+STATUSES = ('pending', 'approved', 'rejected')
+
+# Column names of the leave history export (check_employee_leave.py), mapped to the table columns.
+# Files may use either spelling; NumberOfDays is derived and ignored.
+EXPORT_COLUMNS = {
+    'EmployeeName': 'name',
+    'EmployeeRole': 'role',
+    'CurrentLeaveBalance': 'leave_balance',
+    'LeaveStartDate': 'start_date',
+    'LeaveEndDate': 'end_date',
+    'ReasonForLeave': 'leave_reason',
+    'LeaveStatus': 'status',
+    'DateApplied': 'applied_on',
+    'DateProcessed': 'processed_on',
+}
+
+# --- Bulk Import ---
+# The file is read with the csv module and staged as raw text into a TEMP table, one executemany per
+# chunk, without taking the write lock. It is then validated set-based in SQL over the whole file:
+# one UPDATE gives every row its first error, if any, a later row with the same leave_id supersedes an
+# earlier one, and overlapping pending/approved requests of an employee are resolved by status. The
+# accepted rows are merged in write transactions of IMPORT_CHUNK_SIZE staged rows (employees in the
+# first): foreign-key and overlap checks against the stored data, upserts, balance adjustments through
+# the leave ledger, and re-indexing of the daily absences. A file holds employees (name, role and
+# optionally emp_id and leave_balance), leave requests (emp_id, start_date, end_date, status and
+# optionally leave_id, leave_reason, applied_on, processed_on), or both per row, as in the export.
+#
+# Rows with an emp_id or leave_id update that record; rows without one are added, except that a row
+# carrying a leave request must name its employee by emp_id (as the export does). A balance in the
+# file is authoritative: the difference to the stored balance is booked as an 'Imported balance'
+# adjustment, and imported leave requests never deduct from balances themselves.
+#
+# A bulk load, one that adds more leave requests than are stored, is merged in one transaction that
+# drops the leave_requests indexes and full-text triggers and rebuilds them, the search index and the
+# absence index at the end, as generate_data.py does: building an index is a sort, while maintaining
+# four of them row by row in random key order took most of a fresh import. The app's writers wait for
+# that transaction; its readers keep seeing the indexed data until it commits.
+
+STAGING_TABLES = (
+    '''
+    CREATE TEMP TABLE import_employees (
+        emp_id INTEGER PRIMARY KEY, row INTEGER, name TEXT, role TEXT, leave_balance INTEGER, is_new INTEGER
+    )
+    ''',
+    '''
+    CREATE TEMP TABLE import_batch (
+        row INTEGER PRIMARY KEY, leave_id INTEGER, emp_id INTEGER, start_date TEXT, end_date TEXT,
+        leave_reason TEXT, status TEXT, applied_on TEXT, processed_on TEXT
+    )
+    ''',
+)
+
+def _drop_staging(conn):
+    """Drops the import's TEMP tables, which hold the whole file during an import."""
+    for table in ('import_rows', 'import_employees', 'import_batch'):
+        conn.execute(f'DROP TABLE IF EXISTS temp.{table}')
+
+@contextmanager
+def _write_transaction(conn):
+    """Runs the block as one write transaction on the import's own connection, like database.transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def _stage_file(conn, path, chunk_size):
+    """
+    Streams the CSV into the TEMP table import_rows: row (the 1-based data row number), error, and the
+    file's columns as text (c0, c1, ...). Returns the header.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"'{path}' has no header row.")
+        width = len(header)
+        conn.execute(f'CREATE TEMP TABLE import_rows (row INTEGER PRIMARY KEY, error TEXT, '
+                     f'{", ".join(f"c{i} TEXT" for i in range(width))})')
+        insert = f'INSERT INTO import_rows ({", ".join(f"c{i}" for i in range(width))}) VALUES ({", ".join("?" * width)})'
+        too_long = []
+        staged = 0
+        while chunk := list(itertools.islice(reader, chunk_size)):
+            # Blank lines are skipped and short rows padded, as pandas.read_csv does; rowids follow the rows
+            rows = [fields for fields in chunk if fields]
+            for i, fields in enumerate(rows):
+                if len(fields) != width:
+                    if len(fields) > width:
+                        too_long.append((staged + i + 1,))
+                    rows[i] = (fields + [''] * width)[:width]
+            conn.executemany(insert, rows)
+            staged += len(rows)
+    conn.executemany("UPDATE import_rows SET error = 'Too many fields.' WHERE row = ?", too_long)
+    conn.commit()
+    return header
+
+def _columns(header):
+    """
+    Maps the table columns the file provides to their staged column (c0, c1, ...). The export's column
+    names are translated; NumberOfDays and unknown columns are ignored.
+    """
+    columns = {}
+    for i, name in enumerate(header):
+        columns.setdefault(EXPORT_COLUMNS.get(name.strip(), name.strip()), f"c{i}")
+    return columns
+
+def _choice(column, choices):
+    """SQL for a role/status column: as given if valid, else trimmed and lower-cased (only then a function call)."""
+    return f"CASE WHEN {column} IN {choices} THEN {column} ELSE lower(trim({column})) END"
+
+def _not_integer(column):
+    return f"{column} GLOB '*[^0-9]*'"
+
+def _not_timestamp(column):
+    return f"({column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' OR julianday({column}) IS NULL)"
+
+def _validate(conn, columns):
+    """
+    Records the first error of every invalid staged row in import_rows.error, checking employees, then
+    leave requests. Ids and balances are digits, dates YYYY-MM-DD, timestamps ISO 8601.
+    """
+    checks = []
+    if 'name' in columns:
+        if 'emp_id' in columns:
+            checks.append(("Invalid emp_id.", _not_integer(columns['emp_id'])))
+        checks.append(("Missing employee name.", f"trim({columns['name']}) = ''"))
+        if 'role' in columns:
+            checks.append(("Invalid role.", f"{_choice(columns['role'], ROLES)} NOT IN {ROLES}"))
+        if 'leave_balance' in columns:
+            checks.append(("Invalid leave balance.", _not_integer(columns['leave_balance'])))
+    if 'start_date' in columns:
+        emp_id = columns.get('emp_id', "''")
+        checks.append(("Missing or invalid emp_id.", f"{emp_id} = '' OR {_not_integer(emp_id)}"))
+        if 'leave_id' in columns:
+            checks.append(("Invalid leave_id.", _not_integer(columns['leave_id'])))
+        start, end = columns['start_date'], columns.get('end_date', columns['start_date'])
+        # A modifier makes date() normalize days past the month's end (2026-02-30), which it otherwise echoes
+        checks.append(("Invalid start date (use YYYY-MM-DD).", f"date({start}, '+0 days') IS NOT {start}"))
+        checks.append(("Invalid end date (use YYYY-MM-DD).", f"date({end}, '+0 days') IS NOT {end}"))
+        checks.append(("End date before start date.", f"{end} < {start}"))
+        if 'status' in columns:
+            checks.append(("Invalid status.", f"{_choice(columns['status'], STATUSES)} NOT IN {STATUSES}"))
+        for column in ('applied_on', 'processed_on'):
+            if column in columns:
+                checks.append((f"Invalid {column} timestamp.", f"{columns[column]} != '' AND {_not_timestamp(columns[column])}"))
+    first_error = f"CASE {' '.join(f'WHEN {condition} THEN ?' for _, condition in checks)} END"
+    messages = [message for message, _ in checks]
+    # Valid rows are only read: the WHERE clause evaluates the checks, and just the invalid rows are written
+    conn.execute(f"UPDATE import_rows SET error = {first_error} WHERE error IS NULL AND {first_error} IS NOT NULL",
+                 messages + messages)
+    conn.commit()
+
+def _leave_values(columns):
+    """SQL expressions over import_rows for the leave request columns: the file's (valid) value or the default."""
+    def value(name, expr, default):
+        return expr.format(columns[name]) if name in columns else default
+    start_date = columns['start_date']
+    return {
+        'leave_id': value('leave_id', "CASE WHEN {0} != '' THEN CAST({0} AS INTEGER) END", 'NULL'),
+        'emp_id': f"CAST({columns['emp_id']} AS INTEGER)",
+        'start_date': start_date,
+        'end_date': value('end_date', "{0}", start_date),
+        'leave_reason': value('leave_reason', "CASE WHEN {0} != '' THEN {0} END", 'NULL'),
+        'status': _choice(columns['status'], STATUSES) if 'status' in columns else "'pending'",
+        'applied_on': value('applied_on', "CASE WHEN {0} != '' THEN {0} ELSE :now END", ':now'),
+        'processed_on': value('processed_on', "CASE WHEN {0} != '' THEN {0} END", 'NULL'),
+    }
+
+def _resolve_leaves(conn, columns):
+    """
+    Rejects the valid leave requests that another row of the file displaces: an earlier row with the
+    same leave_id (superseded), or a pending/approved row overlapping one of the same employee.
+    """
+    values = _leave_values(columns)
+    if 'leave_id' in columns:
+        leave_id = values['leave_id']
+        conn.execute(f'''
+            UPDATE import_rows SET error = 'Superseded by a later row with the same leave_id.'
+            WHERE row IN (
+                SELECT r.row FROM import_rows r JOIN (
+                    SELECT {leave_id} AS leave_id, MAX(row) AS last_row FROM import_rows
+                    WHERE error IS NULL AND {leave_id} IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1
+                ) d ON d.leave_id = {leave_id.replace(columns['leave_id'], 'r.' + columns['leave_id'])}
+                WHERE r.error IS NULL AND r.row < d.last_row)
+        ''')
+    # Only employees with overlapping pending/approved rows (in start order, a row starting on or before
+    # the latest end before it) are resolved row by row
+    placeholders = ', '.join('?' for _ in ACTIVE_STATUSES)
+    candidates = conn.execute(f'''
+        WITH active AS (
+            SELECT row, {values['emp_id']} AS emp_id, {values['start_date']} AS start_date,
+                   {values['end_date']} AS end_date, {values['status']} = 'approved' AS approved
+            FROM import_rows WHERE error IS NULL AND {values['status']} IN ({placeholders})
+        )
+        SELECT row, emp_id, start_date, end_date FROM active
+        WHERE emp_id IN (
+            SELECT emp_id FROM (
+                SELECT emp_id, start_date, MAX(end_date) OVER (
+                    PARTITION BY emp_id ORDER BY start_date, row ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                ) AS latest_end
+                FROM active
+            ) WHERE start_date <= latest_end)
+        ORDER BY emp_id, approved DESC, start_date, row
+    ''', ACTIVE_STATUSES).fetchall()
+    conn.executemany("UPDATE import_rows SET error = 'Overlaps another pending or approved leave in the file.' "
+                     "WHERE row = ?", [(row,) for row in _overlapping_rows(candidates)])
+    conn.commit()
+
+def _overlapping_rows(candidates):
+    """
+    Resolves overlaps among an employee's pending/approved rows, given as (row, emp_id, start, end) in
+    (employee, approved first, start) order: a row is kept unless it overlaps one already kept, so
+    approved rows win over pending ones and a row that lost never blocks another. Returns the losers.
+    """
+    overlapping = []
+    kept, current = [], None
+    for row, emp_id, start, end in candidates:
+        if emp_id != current:
+            kept, current = [], emp_id
+        if any(start <= kept_end and kept_start <= end for kept_start, kept_end in kept):
+            overlapping.append(row)
+        else:
+            kept.append((start, end))
+    return overlapping
+
+def _next_id(conn, table, column, explicit):
+    """Returns the first unused id for rows that bring none (above the table, its AUTOINCREMENT counter and explicit)."""
+    used = conn.execute(f"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0), "
+                        f"COALESCE((SELECT MAX({column}) FROM {table}), 0))", (table,)).fetchone()[0]
+    return max(used, explicit or 0) + 1
+
+def _merge_employees(conn, columns, now):
+    """
+    Upserts the file's valid employees (the last row of each emp_id; rows without one are added) and
+    books balance differences to the ledger. Returns the number of distinct employees upserted.
+    """
+    emp_id = f"CASE WHEN {columns['emp_id']} != '' THEN CAST({columns['emp_id']} AS INTEGER) END" if 'emp_id' in columns else 'NULL'
+    role = _choice(columns['role'], ROLES) if 'role' in columns else "'employee'"
+    balance = (f"CASE WHEN {columns['leave_balance']} != '' THEN CAST({columns['leave_balance']} AS INTEGER) END"
+               if 'leave_balance' in columns else 'NULL')
+    values = f"trim({columns['name']}), {role}, {balance}"
+    explicit = conn.execute(f'SELECT MAX({emp_id}) FROM import_rows WHERE error IS NULL').fetchone()[0]
+    # With MAX(row), SQLite takes the other columns from the last row of each group
+    conn.execute(f'''
+        INSERT INTO import_employees (row, emp_id, name, role, leave_balance)
+        SELECT MAX(row), {emp_id}, {values} FROM import_rows WHERE error IS NULL AND {emp_id} IS NOT NULL GROUP BY 2
+        UNION ALL
+        SELECT row, ? + ROW_NUMBER() OVER (ORDER BY row) - 1, {values} FROM import_rows WHERE error IS NULL AND {emp_id} IS NULL
+    ''', (_next_id(conn, 'employees', 'emp_id', explicit),))
+    conn.execute('UPDATE import_employees SET is_new = emp_id NOT IN (SELECT emp_id FROM employees)')
+    conn.execute('''
+        INSERT INTO employees (emp_id, name, role, leave_balance)
+        SELECT emp_id, name, role, 0 FROM import_employees WHERE true
+        ON CONFLICT (emp_id) DO UPDATE SET name = excluded.name, role = excluded.role
+    ''')
+    # New employees get a starting accrual like add_employee (the yearly allowance if the file has no
+    # balance); existing ones an adjustment by the difference to the file's balance
+    conn.execute('''
+        INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+        SELECT s.emp_id, ?, 'accrual', COALESCE(s.leave_balance, ?), 'Starting balance', ?
+        FROM import_employees s WHERE s.is_new
+    ''', (now[:4], MAX_LEAVE_PER_YEAR, now))
+    conn.execute('''
+        INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+        SELECT s.emp_id, ?, 'adjustment', s.leave_balance - e.leave_balance, 'Imported balance', ?
+        FROM import_employees s JOIN employees e ON e.emp_id = s.emp_id
+        WHERE NOT s.is_new AND s.leave_balance != e.leave_balance
+    ''', (now[:4], now))
+    return conn.execute('SELECT COUNT(*) FROM import_employees').fetchone()[0]
+
+def _reject_batch(conn, message, query, params=()):
+    """Rejects the import_batch rows whose row numbers query returns with message."""
+    rejected = [(row[0],) for row in conn.execute(query, params)]
+    conn.executemany('UPDATE import_rows SET error = ? WHERE row = ?', [(message, row) for row, in rejected])
+    conn.executemany('DELETE FROM import_batch WHERE row = ?', rejected)
+
+def _merge_leaves(conn, columns, first_row, last_row, now, bulk, explicit):
+    """
+    Copies the valid leave requests of rows first_row..last_row into import_batch (rows without a
+    leave_id get one here, above the largest in the file, explicit), rejects those of unknown employees
+    or overlapping stored ones, then upserts the rest, re-indexes their absences and records the batch
+    if it wrote any. A bulk load rebuilds the indexes instead of maintaining them. Returns the number accepted.
+    """
+    values = _leave_values(columns)
+    leave_id = values.pop('leave_id')
+    params = {'first_row': first_row, 'last_row': last_row, 'now': now}
+    valid = conn.execute('SELECT COUNT(*) FROM import_rows WHERE row BETWEEN :first_row AND :last_row AND error IS NULL',
+                         params).fetchone()[0]
+    conn.execute('DELETE FROM import_batch')
+    # Unchanged rows (e.g. re-importing an export) are accepted as they are, sparing their checks, index and FTS updates
+    copied = conn.execute(f'''
+        INSERT INTO import_batch (row, leave_id, {', '.join(values)})
+        SELECT * FROM (
+            SELECT row, {leave_id} AS leave_id, {', '.join(f'{expr} AS {name}' for name, expr in values.items())}
+            FROM import_rows WHERE row BETWEEN :first_row AND :last_row AND error IS NULL
+        ) s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM leave_requests lr
+            WHERE lr.leave_id = s.leave_id AND (lr.emp_id, lr.start_date, lr.end_date, lr.status, lr.applied_on)
+                = (s.emp_id, s.start_date, s.end_date, s.status, s.applied_on)
+              AND lr.leave_reason IS s.leave_reason AND lr.processed_on IS s.processed_on)
+    ''', params).rowcount
+    if conn.execute('SELECT 1 FROM import_batch WHERE leave_id IS NULL LIMIT 1').fetchone():
+        conn.execute('''
+            UPDATE import_batch SET leave_id = :first_id + new.n - 1
+            FROM (SELECT row, ROW_NUMBER() OVER (ORDER BY row) AS n FROM import_batch WHERE leave_id IS NULL) AS new
+            WHERE import_batch.row = new.row
+        ''', {'first_id': _next_id(conn, 'leave_requests', 'leave_id', explicit)})
+    placeholders = ', '.join('?' for _ in ACTIVE_STATUSES)
+    _reject_batch(conn, "Unknown employee.", 'SELECT row FROM import_batch WHERE emp_id NOT IN (SELECT emp_id FROM employees)')
+    _reject_batch(conn, "Overlaps an existing pending or approved leave.", f'''
+        SELECT s.row FROM import_batch s
+        WHERE s.status IN ({placeholders}) AND EXISTS (
+            SELECT 1 FROM leave_requests lr
+            WHERE lr.emp_id = s.emp_id AND lr.status IN ({placeholders})
+              AND lr.start_date <= s.end_date AND lr.end_date >= s.start_date AND lr.leave_id != s.leave_id)
+    ''', (*ACTIVE_STATUSES, *ACTIVE_STATUSES))
+    accepted = valid - copied + conn.execute('SELECT COUNT(*) FROM import_batch').fetchone()[0]
+    if bulk:
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                "AND tbl_name = 'leave_requests'").fetchall()
+        indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                               "AND tbl_name = 'leave_requests' AND sql IS NOT NULL").fetchall()
+        for trigger in triggers:
+            conn.execute(f'DROP TRIGGER {trigger["name"]}')
+        for index in indexes:
+            conn.execute(f'DROP INDEX {index["name"]}')
+    else:
+        unindex_leaves(conn, 'import_batch')
+    # In leave_id order, the new rows append to the table instead of splitting pages all over it
+    written = conn.execute('''
+        INSERT INTO leave_requests (leave_id, emp_id, start_date, end_date, leave_reason, status, applied_on, processed_on)
+        SELECT leave_id, emp_id, start_date, end_date, leave_reason, status, applied_on, processed_on
+        FROM import_batch WHERE true ORDER BY leave_id
+        ON CONFLICT (leave_id) DO UPDATE SET
+            emp_id = excluded.emp_id, start_date = excluded.start_date, end_date = excluded.end_date,
+            leave_reason = excluded.leave_reason, status = excluded.status,
+            applied_on = excluded.applied_on, processed_on = excluded.processed_on
+    ''').rowcount
+    if bulk:
+        for index in indexes:
+            conn.execute(index['sql'])
+        for trigger in triggers:
+            conn.execute(trigger['sql'])
+        conn.execute("INSERT INTO leave_reasons_fts (leave_reasons_fts) VALUES ('rebuild')")
+        rebuild_absences(conn)
+    else:
+        index_leaves(conn, 'import_batch')
+    # The rows keep the file's leave_id and processed_on, which can lie below an export's watermark
+    if written:
+        conn.execute('INSERT INTO import_batches (imported_on, leave_requests) VALUES (?, ?)', (now, written))
+    return accepted
+
+def _is_bulk_load(conn, columns, valid):
+    """Whether the file's valid rows (valid of them, at most) add more leave requests than are stored."""
+    stored = conn.execute('SELECT COUNT(*) FROM leave_requests').fetchone()[0]
+    if valid <= stored:
+        return False
+    leave_id = _leave_values(columns)['leave_id']
+    return conn.execute(f'SELECT COUNT(*) FROM import_rows WHERE error IS NULL AND ({leave_id} IS NULL OR {leave_id} NOT IN '
+                        f'(SELECT leave_id FROM leave_requests))').fetchone()[0] > stored
+
+def _write_rejected(conn, header, rejected_path):
+    """Writes the rejected rows to rejected_path: the file's columns, then row and error. Returns how many."""
+    rows = conn.execute(f'SELECT {", ".join(f"c{i}" for i in range(len(header)))}, row, error '
+                        f'FROM import_rows WHERE error IS NOT NULL ORDER BY row').fetchall()
+    if rows:
+        with open(rejected_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([*header, 'row', 'error'])
+            writer.writerows(rows)
+    return len(rows)
+
+@timed
+def import_csv(path, rejected_path=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Streams a CSV of employees and/or leave requests (including the leave history export) into the
+    database: staged and validated as a whole, then merged in transactions of chunk_size rows (one for
+    a bulk load). Rejected rows are written to rejected_path (default: <path>.rejected.csv), only if
+    there are any, with the file's own columns followed by `row` (the 1-based data row number) and
+    `error`. Returns a summary dict.
+    """
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be at least 1.")
+    rejected_path = rejected_path or os.path.splitext(path)[0] + ".rejected.csv"
+    if os.path.exists(rejected_path):
+        os.remove(rejected_path)
+    migrate()
+    summary = {'rows': 0, 'employees': 0, 'leave_requests': 0, 'rejected': 0}
+    started = time.perf_counter()
+    now = datetime.now().isoformat()
+    with connection() as conn:
+        cache_sizes = [(schema, conn.execute(f'PRAGMA {schema}.cache_size').fetchone()[0]) for schema in ('main', 'temp')]
+        for schema, _ in cache_sizes:
+            conn.execute(f'PRAGMA {schema}.cache_size=-{IMPORT_CACHE_KIB}')
+        try:
+            _drop_staging(conn)
+            header = _stage_file(conn, path, chunk_size)
+            columns = _columns(header)
+            has_employees = 'name' in columns
+            has_leaves = 'start_date' in columns
+            if not has_employees and not has_leaves:
+                raise ValueError("The file needs a name (employees) or start_date (leave requests) column.")
+            for statement in STAGING_TABLES:
+                conn.execute(statement)
+            _validate(conn, columns)
+            if has_leaves:
+                _resolve_leaves(conn, columns)
+            summary['rows'], valid = conn.execute('SELECT COUNT(*), COUNT(*) - COUNT(error) FROM import_rows').fetchone()
+            bulk = has_leaves and _is_bulk_load(conn, columns, valid)
+            explicit = has_leaves and conn.execute(f"SELECT MAX({_leave_values(columns)['leave_id']}) FROM import_rows "
+                                                   f"WHERE error IS NULL").fetchone()[0]
+            step = max(summary['rows'], 1) if bulk else chunk_size
+            for first_row in range(1, max(summary['rows'], 1) + 1, step):
+                with _write_transaction(conn):
+                    if has_employees and first_row == 1:
+                        summary['employees'] = _merge_employees(conn, columns, now)
+                    if has_leaves:
+                        summary['leave_requests'] += _merge_leaves(conn, columns, first_row, first_row + step - 1, now, bulk, explicit)
+            summary['rejected'] = _write_rejected(conn, header, rejected_path)
+        finally:
+            conn.rollback()
+            _drop_staging(conn)
+            for schema, cache_size in cache_sizes:
+                conn.execute(f'PRAGMA {schema}.cache_size={cache_size}')
+    summary['seconds'] = time.perf_counter() - started
+    bump_data_version()
+    return summary
+
+# --- Script Entry Point ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import employees and leave requests from a CSV file "
+                                                 "(e.g. the employee_leave_history.csv export).")
+    parser.add_argument("path")
+    parser.add_argument("--rejected", help="where to write rejected rows (default: <path>.rejected.csv)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    try:
+        result = import_csv(args.path, args.rejected, args.chunk_size)
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"Import failed: {e}")
+    else:
+        print(f"Imported {result['rows'] - result['rejected']} of {result['rows']} rows "
+              f"({result['employees']} employees, {result['leave_requests']} leave requests) in "
+              f"{result['seconds']:.1f}s, {result['rows'] / max(result['seconds'], 1e-9):.0f} rows/sec.")
+        if result['rejected']:
+            print(f"{result['rejected']} rows rejected; see '{args.rejected or os.path.splitext(args.path)[0] + '.rejected.csv'}'.")
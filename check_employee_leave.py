@@ -1,112 +1,587 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import shutil
 import sqlite3
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
 
+from database import DB_NAME, open_read_only
+from snapshot import ensure_snapshot, read_connection
+
 # Constants
-DB_NAME = "leave_management.db"
 CSV_FILE_NAME = "employee_leave_history.csv"
 
-def get_connection():
-    """Establishes and returns a database connection with row_factory set to sqlite3.Row."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Rows read from SQLite and written to the CSV per chunk
+EXPORT_CHUNK_SIZE = 10000
+
+# The watermark of the last export is stored next to the CSV, e.g. employee_leave_history.csv.watermark.json,
+# so deleting the CSV also resets incremental exports.
+WATERMARK_SUFFIX = ".watermark.json"
+
+# Columnar exports are written as a dataset directory partitioned by the year of LeaveStartDate
+# (hive style: <dir>/year=2024/part-0.parquet). Keys are the --format choices.
+COLUMNAR_FORMATS = {
+    'parquet': ('parquet', "employee_leave_history.parquet"),
+    'feather': ('ipc', "employee_leave_history.arrow"),
+}
+
+# A parallel export splits the employees into this many name ranges per worker process, so a worker
+# that draws a heavy range does not hold up the others
+PARTITIONS_PER_WORKER = 4
+
+# A logical order for the columns in the CSV for better readability
+ORDERED_COLUMNS = [
+    'emp_id',
+    'EmployeeName',
+    'EmployeeRole',
+    'CurrentLeaveBalance',
+    'leave_id',
+    'LeaveStartDate',
+    'LeaveEndDate',
+    'NumberOfDays',
+    'ReasonForLeave',
+    'LeaveStatus',
+    'DateApplied',
+    'DateProcessed'
+]
+
+# SQL query to join employees and leave_requests tables.
+# It selects all relevant fields to provide a full leave history context, and does the per-row
+# work in SQLite: newlines in the reason are replaced with spaces, and the number of days is
+# computed with julianday() ("N/A" when dates are malformed or missing). SQLite never reorders a
+# CROSS JOIN, so leave_requests stays the outer loop and filters on it (the delta query) use its indexes.
+LEAVE_HISTORY_COLUMNS = '''
+    SELECT
+        e.emp_id,
+        e.name AS EmployeeName,
+        e.role AS EmployeeRole,
+        e.leave_balance AS CurrentLeaveBalance,
+        lr.leave_id,
+        lr.start_date AS LeaveStartDate,
+        lr.end_date AS LeaveEndDate,
+        COALESCE(CAST(julianday(lr.end_date) - julianday(lr.start_date) + 1 AS INTEGER), 'N/A') AS NumberOfDays,
+        REPLACE(lr.leave_reason, char(10), ' ') AS ReasonForLeave,
+        lr.status AS LeaveStatus,
+        lr.applied_on AS DateApplied,
+        lr.processed_on AS DateProcessed
+'''
+LEAVE_HISTORY_SELECT = LEAVE_HISTORY_COLUMNS + '''    FROM leave_requests lr
+    CROSS JOIN employees e ON lr.emp_id = e.emp_id
+'''
+# leave_id breaks ties, so the order (and the file) is the same however the rows were read
+LEAVE_HISTORY_ORDER = "    ORDER BY e.name, lr.start_date DESC, lr.leave_id\n"
+LEAVE_HISTORY_QUERY = LEAVE_HISTORY_SELECT + LEAVE_HISTORY_ORDER
+
+# One name range of a parallel export. Here employees drive the join, so the range is a seek on
+# idx_employees_name and each employee's requests come from the emp_id index.
+LEAVE_HISTORY_PARTITION_SELECT = LEAVE_HISTORY_COLUMNS + '''    FROM employees e
+    CROSS JOIN leave_requests lr ON lr.emp_id = e.emp_id
+'''
+
+# Requests created or processed since the watermark. Each side is an index range seek
+# (leave_id is the rowid, processed_on has idx_leave_requests_processed_on); spelling the OR as a
+# UNION keeps the planner from falling back to a full scan when it cannot see the bound values.
+# unlikely() tells it the processed_on range is small (it is: only what changed since the last export),
+# which keeps it on the index even when the statistics are stale.
+LEAVE_HISTORY_DELTA_QUERY = LEAVE_HISTORY_SELECT + '''
+    WHERE lr.leave_id IN (
+        SELECT leave_id FROM leave_requests WHERE leave_id > ?
+        UNION ALL
+        SELECT leave_id FROM leave_requests WHERE unlikely(processed_on > ?)
+    )
+    ORDER BY lr.leave_id
+'''
+
+# Current balances of the employees whose ledger gained entries since the watermark; entry_id is the
+# rowid, so this is a range seek however long the ledger is. Accruals and adjustments change
+# balances without touching leave_requests, so the delta query above cannot see them.
+CHANGED_BALANCES_QUERY = '''
+    SELECT emp_id, leave_balance FROM employees
+    WHERE emp_id IN (SELECT emp_id FROM leave_ledger WHERE entry_id > ?)
+'''
+
+def last_ledger_entry(conn):
+    """Returns the highest leave_ledger entry_id (0 for an empty ledger)."""
+    return conn.execute('SELECT COALESCE(MAX(entry_id), 0) FROM leave_ledger').fetchone()[0]
+
+def last_import_batch(conn):
+    """Returns the highest import_batches batch_id (0 if nothing was ever bulk imported)."""
+    return conn.execute('SELECT COALESCE(MAX(batch_id), 0) FROM import_batches').fetchone()[0]
+
+def iter_leave_history(conn, chunk_size=EXPORT_CHUNK_SIZE, query=LEAVE_HISTORY_QUERY, params=()):
+    """Streams the leave history as DataFrames of at most chunk_size rows, in query order."""
+    return pd.read_sql_query(query, conn, params=params, chunksize=chunk_size)
+
+def write_csv_chunks(chunks, output_path):
+    """
+    Appends each DataFrame chunk to a temporary file next to output_path and moves it into place
+    once complete, so readers never see a half-written export. Returns the number of rows written.
+    """
+    tmp_path = output_path + ".tmp"
+    rows = 0
+    try:
+        for chunk in chunks:
+            chunk.to_csv(tmp_path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(chunk)
+        if rows:
+            os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+# --- Watermarks ---
+
+def read_watermark(output_path):
+    """Returns the watermark saved with an export, or None if there is no usable previous export."""
+    try:
+        with open(output_path + WATERMARK_SUFFIX) as f:
+            watermark = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return watermark if os.path.exists(output_path) else None
+
+def write_watermark(output_path, last_leave_id, last_processed_on, last_entry_id=0, last_import_batch=0):
+    """
+    Records the highest leave_id and processed_on timestamp contained in an export, and the highest
+    leave ledger entry_id and bulk import batch whose changes it reflects.
+    """
+    with open(output_path + WATERMARK_SUFFIX, 'w') as f:
+        json.dump({
+            'last_leave_id': last_leave_id,
+            'last_processed_on': last_processed_on,
+            'last_entry_id': last_entry_id,
+            'last_import_batch': last_import_batch,
+            'exported_at': datetime.now().isoformat(),
+        }, f)
+
+def _advance_watermark(watermark, chunk):
+    """Folds a chunk's highest leave_id and processed_on into the running watermark."""
+    if chunk.empty:
+        return watermark
+    last_leave_id = max(watermark['last_leave_id'], int(chunk['leave_id'].max()))
+    processed = chunk['DateProcessed'].dropna()
+    last_processed_on = watermark['last_processed_on']
+    if not processed.empty:
+        last_processed_on = max(last_processed_on, processed.max())
+    return {**watermark, 'last_leave_id': last_leave_id, 'last_processed_on': last_processed_on}
+
+def _tracking(chunks, watermark):
+    """Passes chunks through while updating watermark (a dict) in place."""
+    for chunk in chunks:
+        watermark.update(_advance_watermark(watermark, chunk))
+        yield chunk
+
+# --- Export Functions ---
+
+def _reporting(chunks, progress):
+    """Passes chunks through, calling progress(rows_so_far) once each chunk has been consumed."""
+    rows = 0
+    for chunk in chunks:
+        yield chunk
+        rows += len(chunk)
+        progress(rows)
+
+def count_leave_history(conn):
+    """Returns the number of rows a full export will contain (used as the progress total)."""
+    return conn.execute('SELECT COUNT(*) FROM leave_requests').fetchone()[0]
+
+def write_leave_history_csv(output_path=CSV_FILE_NAME, chunk_size=EXPORT_CHUNK_SIZE, progress=None, snapshot=False):
+    """
+    Streams the full leave history into output_path. Errors are raised, not printed.
+    progress, if given, is called with the number of rows written so far after every chunk.
+    With snapshot=True it reads the snapshot copy instead of the live database (see snapshot.py).
+    Returns (rows, watermark) where watermark holds the highest leave_id and processed_on exported and
+    the last ledger entry and import batch (read first, so changes made during the export are picked
+    up by the next incremental run).
+    """
+    watermark = {'last_leave_id': 0, 'last_processed_on': ''}
+    with read_connection(snapshot) as conn:
+        watermark['last_entry_id'] = last_ledger_entry(conn)
+        watermark['last_import_batch'] = last_import_batch(conn)
+        chunks = _tracking(iter_leave_history(conn, chunk_size), watermark)
+        chunks = (chunk[ORDERED_COLUMNS] for chunk in chunks)
+        if progress is not None:
+            chunks = _reporting(chunks, progress)
+        rows = write_csv_chunks(chunks, output_path)
+    return rows, watermark
 
-def export_employee_leave_history_to_csv():
+def export_employee_leave_history_to_csv(output_path=CSV_FILE_NAME, chunk_size=EXPORT_CHUNK_SIZE, snapshot=False):
     """
     Fetches all employee and leave request data, calculates leave duration,
     and exports it into a CSV file for better analysis of leave history.
+    The join is streamed in chunks, so memory use stays flat regardless of table size.
+    snapshot=True reads the snapshot copy, so the export does not hold a read transaction on the live database.
     """
     if not os.path.exists(DB_NAME):
         print(f"Error: Database file '{DB_NAME}' not found. "
               "Please ensure the main Streamlit application has been run at least once to create the database.")
         return
 
-    conn = get_connection()
-    c = conn.cursor()
-
     try:
-        # SQL query to join employees and leave_requests tables
-        # It selects all relevant fields to provide a full leave history context.
-        c.execute('''
-            SELECT
-                e.emp_id,
-                e.name AS EmployeeName,
-                e.role AS EmployeeRole,
-                e.leave_balance AS CurrentLeaveBalance,
-                lr.leave_id,
-                lr.start_date AS LeaveStartDate,
-                lr.end_date AS LeaveEndDate,
-                lr.leave_reason AS ReasonForLeave,
-                lr.status AS LeaveStatus,
-                lr.applied_on AS DateApplied,
-                lr.processed_on AS DateProcessed
-            FROM leave_requests lr
-            JOIN employees e ON lr.emp_id = e.emp_id
-            ORDER BY e.name, lr.start_date DESC
-        ''')
-        rows = c.fetchall()
+        rows, watermark = write_leave_history_csv(output_path, chunk_size, snapshot=snapshot)
 
         if not rows:
             print("No employee leave history found in the database.")
             return
 
-        # Prepare a list of dictionaries to build the DataFrame
-        data_for_df = []
-        for row in rows:
-            row_dict = dict(row)
-            
-            # --- NEW LOGIC: Clean the ReasonForLeave field ---
-            if row_dict['ReasonForLeave'] is not None:
-                # Replace any newline characters with a space
-                row_dict['ReasonForLeave'] = row_dict['ReasonForLeave'].replace('\n', ' ')
-            # --- END OF NEW LOGIC ---
-            
-            # Calculate the number of days for the leave request
-            try:
-                start_date = datetime.strptime(row_dict['LeaveStartDate'], "%Y-%m-%d")
-                end_date = datetime.strptime(row_dict['LeaveEndDate'], "%Y-%m-%d")
-                row_dict['NumberOfDays'] = (end_date - start_date).days + 1
-            except (ValueError, TypeError):
-                row_dict['NumberOfDays'] = "N/A" # Indicate if dates are malformed or missing
-
-            data_for_df.append(row_dict)
-
-        # Convert the list of dictionaries to a Pandas DataFrame
-        df = pd.DataFrame(data_for_df)
-        
-        # Define a logical order for the columns in the CSV for better readability
-        ordered_columns = [
-            'emp_id',
-            'EmployeeName',
-            'EmployeeRole',
-            'CurrentLeaveBalance',
-            'leave_id',
-            'LeaveStartDate',
-            'LeaveEndDate',
-            'NumberOfDays',
-            'ReasonForLeave',
-            'LeaveStatus',
-            'DateApplied',
-            'DateProcessed'
-        ]
-        
-        # Ensure only existing columns are included and in the desired order
-        df = df[[col for col in ordered_columns if col in df.columns]]
-
-        # Export the DataFrame to a CSV file
-        df.to_csv(CSV_FILE_NAME, index=False)
-
-        print(f"Success: Employee leave history has been exported to '{CSV_FILE_NAME}'.")
+        write_watermark(output_path, watermark['last_leave_id'], watermark['last_processed_on'],
+                        watermark['last_entry_id'], watermark['last_import_batch'])
+        print(f"Success: Employee leave history has been exported to '{output_path}'.")
 
     except sqlite3.Error as e:
         print(f"Database error occurred: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+
+def export_leave_history_incremental(output_path=CSV_FILE_NAME, chunk_size=EXPORT_CHUNK_SIZE, delta_only=False,
+                                     snapshot=False):
+    """
+    Exports only the requests created or processed since the previous export's watermark.
+    By default the delta is upserted into the existing CSV: rows are replaced by leave_id, new rows are
+    appended at the end, and CurrentLeaveBalance is refreshed for every employee in the delta and every
+    employee with leave ledger entries (accruals, adjustments) newer than the watermark. With
+    delta_only=True the changed rows are written to a separate, timestamped delta file instead; the
+    watermark advances either way, so the base CSV plus its delta files together form the history.
+    Falls back to a full export when there is no previous export to build on, or when leave requests
+    were bulk imported since (imported rows keep their own leave_id and processed_on, so the delta
+    query cannot tell them apart from exported ones). With snapshot=True the
+    delta is read from the snapshot copy, so it reaches as far as the snapshot does.
+    """
+    watermark = read_watermark(output_path)
+    if watermark is None:
+        print("No previous export watermark found; running a full export.")
+        export_employee_leave_history_to_csv(output_path, chunk_size, snapshot)
+        return
+
+    try:
+        with read_connection(snapshot) as conn:
+            imported = last_import_batch(conn) > watermark.get('last_import_batch', 0)
+        if imported:
+            print("Leave requests were bulk imported since the last export; running a full export.")
+            export_employee_leave_history_to_csv(output_path, chunk_size, snapshot)
+            return
+
+        with read_connection(snapshot) as conn:
+            # Watermark files written before the ledger was tracked refresh every ledger balance once
+            last_entry_id = last_ledger_entry(conn)
+            balances = conn.execute(CHANGED_BALANCES_QUERY, (watermark.get('last_entry_id', 0),)).fetchall()
+            chunks = list(iter_leave_history(conn, chunk_size, LEAVE_HISTORY_DELTA_QUERY,
+                                             (watermark['last_leave_id'], watermark['last_processed_on'])))
+        chunks = [chunk for chunk in chunks if not chunk.empty]
+        if not chunks and (delta_only or not balances):
+            print("Export is up to date; no new or newly processed leave requests"
+                  + ("." if delta_only else " or balance changes."))
+            return
+        if chunks:
+            delta = pd.concat(chunks)[ORDERED_COLUMNS]
+        else:
+            delta = pd.DataFrame(columns=ORDERED_COLUMNS)
+
+        if delta_only:
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+            delta_path = f"{os.path.splitext(output_path)[0]}.delta-{stamp}.csv"
+            delta.to_csv(delta_path, index=False)
+            print(f"Success: {len(delta)} changed leave requests written to '{delta_path}'.")
+            # A delta file only carries the balances of its own rows, so ledger-only balance changes stay
+            # pending for the next run that merges into the base CSV
+            last_entry_id = watermark.get('last_entry_id', 0)
+        else:
+            _upsert_csv(output_path, delta, chunk_size, balances)
+            print(f"Success: {len(delta)} new or updated leave requests merged into '{output_path}'"
+                  f" ({len(balances)} balances refreshed from the leave ledger).")
+
+        watermark = _advance_watermark(watermark, delta)
+        write_watermark(output_path, watermark['last_leave_id'], watermark['last_processed_on'], last_entry_id,
+                        watermark.get('last_import_batch', 0))
+
+    except sqlite3.Error as e:
+        print(f"Database error occurred: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+def _upsert_csv(output_path, delta, chunk_size, ledger_balances=()):
+    """
+    Streams the existing CSV, dropping rows the delta replaces and refreshing balances, then appends the delta.
+    ledger_balances are extra (emp_id, leave_balance) pairs to refresh, for employees not in the delta.
+    """
+    replaced_ids = set(delta['leave_id'].astype(str))
+    balances = {str(emp_id): str(balance) for emp_id, balance in ledger_balances}
+    balances.update(zip(delta['emp_id'].astype(str), delta['CurrentLeaveBalance'].astype(str)))
+
+    def merged_chunks():
+        # Read existing rows as plain text so untouched values are written back unchanged
+        for chunk in pd.read_csv(output_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            chunk = chunk[~chunk['leave_id'].isin(replaced_ids)]
+            refreshed = chunk['emp_id'].map(balances)
+            chunk['CurrentLeaveBalance'] = refreshed.fillna(chunk['CurrentLeaveBalance'])
+            yield chunk
+        yield delta
+
+    write_csv_chunks(merged_chunks(), output_path)
+
+# --- Parallel Export ---
+# The employees are cut, in name order, into contiguous name ranges holding about the same number of
+# requests. Each range is exported by a worker process on its own read-only connection, so the
+# per-row CSV formatting runs on several cores. Because the export is ordered by name first, the
+# range files concatenated in order are exactly the serial export.
+
+def _partition_bounds(conn, partitions):
+    """
+    Returns up to `partitions` (name_from, name_to) ranges, name_to exclusive and None for the last one,
+    each covering about the same number of leave requests. Equal names always share a range.
+    """
+    counts = conn.execute('''
+        SELECT e.name, COUNT(lr.leave_id) FROM employees e
+        LEFT JOIN leave_requests lr ON lr.emp_id = e.emp_id
+        GROUP BY e.name ORDER BY e.name
+    ''').fetchall()
+    total = sum(count for _, count in counts)
+    starts, running = [None], 0
+    for name, count in counts:
+        if running >= total * len(starts) / partitions and len(starts) < partitions:
+            starts.append(name)
+        running += count
+    return list(zip(starts, starts[1:] + [None]))
+
+def _export_partition(db_name, name_from, name_to, output_path, chunk_size):
+    """Worker: exports one name range to output_path on its own read-only connection. Returns the row count."""
+    conditions, params = [], []
+    if name_from is not None:
+        conditions.append("e.name >= ?")
+        params.append(name_from)
+    if name_to is not None:
+        conditions.append("e.name < ?")
+        params.append(name_to)
+    query = LEAVE_HISTORY_PARTITION_SELECT
+    if conditions:
+        query += "    WHERE " + " AND ".join(conditions) + "\n"
+    query += LEAVE_HISTORY_ORDER
+    conn = open_read_only(db_name)
+    try:
+        chunks = iter_leave_history(conn, chunk_size, query, params)
+        return write_csv_chunks((chunk[ORDERED_COLUMNS] for chunk in chunks), output_path)
+    finally:
+        conn.close()
+
+def _concatenate_csv(paths, output_path):
+    """Joins CSV files that share a header into output_path (header written once), swapping it in when complete."""
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as out:
+            for i, path in enumerate(paths):
+                with open(path, 'rb') as part:
+                    header = part.readline()
+                    if i == 0:
+                        out.write(header)
+                    shutil.copyfileobj(part, out, 1 << 20)
+        os.replace(tmp_path, output_path)
     finally:
-        if conn:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def export_leave_history_parallel(output_path=CSV_FILE_NAME, workers=None, sharded=False, chunk_size=EXPORT_CHUNK_SIZE,
+                                  snapshot=False):
+    """
+    Full CSV export split across `workers` processes (default: one per CPU). By default the partitions
+    are merged in order into output_path, byte-for-byte the serial export, and the watermark is saved
+    for later incremental runs. With sharded=True they are kept as numbered files next to output_path
+    instead (employee_leave_history.part-000.csv, ...), each with its own header.
+    With snapshot=True every worker reads the same snapshot copy, so the partitions are also consistent
+    with each other.
+    """
+    if not os.path.exists(DB_NAME):
+        print(f"Error: Database file '{DB_NAME}' not found. "
+              "Please ensure the main Streamlit application has been run at least once to create the database.")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    parts_dir = output_path + ".parts"
+    try:
+        source = ensure_snapshot() if snapshot else DB_NAME
+        conn = open_read_only(source)
+        try:
+            # The workers read the live database at different moments, so the watermark is taken here,
+            # before any of them starts: every row at or below it is in some partition, and rows that land
+            # meanwhile are merged again by the next incremental run, which replaces them by leave_id
+            last_leave_id, last_processed_on = conn.execute(
+                "SELECT COALESCE(MAX(leave_id), 0), COALESCE(MAX(processed_on), '') FROM leave_requests").fetchone()
+            last_entry_id = last_ledger_entry(conn)
+            import_batch = last_import_batch(conn)
+            bounds = _partition_bounds(conn, workers * PARTITIONS_PER_WORKER)
+        finally:
             conn.close()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        os.makedirs(parts_dir)
+        paths = [os.path.join(parts_dir, f"part-{i:04d}.csv") for i in range(len(bounds))]
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_export_partition, [source] * len(bounds), *zip(*bounds), paths,
+                                    [chunk_size] * len(bounds)))
+
+        rows = sum(results)
+        if not rows:
+            print("No employee leave history found in the database.")
+            return
+        # Ranges without any leave requests write no file
+        written = [path for path in paths if os.path.exists(path)]
+
+        if sharded:
+            base = os.path.splitext(output_path)[0]
+            for old in glob.glob(glob.escape(base) + ".part-*.csv"):
+                os.remove(old)
+            for i, path in enumerate(written):
+                os.replace(path, f"{base}.part-{i:03d}.csv")
+            print(f"Success: Employee leave history has been exported to {len(written)} files '{base}.part-*.csv'.")
+        else:
+            _concatenate_csv(written, output_path)
+            write_watermark(output_path, last_leave_id, last_processed_on, last_entry_id, import_batch)
+            print(f"Success: Employee leave history has been exported to '{output_path}' ({workers} workers).")
+
+    except sqlite3.Error as e:
+        print(f"Database error occurred: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+# --- Columnar (Parquet / Arrow IPC) Export ---
+
+def _leave_history_schema(pa):
+    """The typed Arrow schema for columnar exports (pyarrow is passed in because it is imported lazily)."""
+    category = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([
+        ('emp_id', pa.int64()),
+        ('EmployeeName', pa.string()),
+        ('EmployeeRole', category),
+        ('CurrentLeaveBalance', pa.int32()),
+        ('leave_id', pa.int64()),
+        ('LeaveStartDate', pa.date32()),
+        ('LeaveEndDate', pa.date32()),
+        ('NumberOfDays', pa.int32()),
+        ('ReasonForLeave', pa.string()),
+        ('LeaveStatus', category),
+        ('DateApplied', pa.timestamp('us')),
+        ('DateProcessed', pa.timestamp('us')),
+        ('year', pa.int16()),
+    ])
+
+def _typed_chunk(chunk):
+    """
+    Converts one exported chunk to proper types: dates and timestamps instead of strings, categorical
+    role/status with fixed categories (so every chunk shares one dictionary), and a nullable integer
+    NumberOfDays that is missing (not "N/A") when dates are malformed.
+    """
+    start = pd.to_datetime(chunk['LeaveStartDate'], format="%Y-%m-%d", errors='coerce')
+    end = pd.to_datetime(chunk['LeaveEndDate'], format="%Y-%m-%d", errors='coerce')
+    return pd.DataFrame({
+        'emp_id': chunk['emp_id'].astype('int64'),
+        'EmployeeName': chunk['EmployeeName'],
+        'EmployeeRole': pd.Categorical(chunk['EmployeeRole'], categories=['employee', 'manager']),
+        'CurrentLeaveBalance': chunk['CurrentLeaveBalance'].astype('Int32'),
+        'leave_id': chunk['leave_id'].astype('int64'),
+        'LeaveStartDate': start.dt.date,
+        'LeaveEndDate': end.dt.date,
+        'NumberOfDays': ((end - start).dt.days + 1).astype('Int32'),
+        'ReasonForLeave': chunk['ReasonForLeave'],
+        'LeaveStatus': pd.Categorical(chunk['LeaveStatus'], categories=['pending', 'approved', 'rejected']),
+        'DateApplied': pd.to_datetime(chunk['DateApplied'], format='ISO8601', errors='coerce'),
+        'DateProcessed': pd.to_datetime(chunk['DateProcessed'], format='ISO8601', errors='coerce'),
+        'year': start.dt.year.astype('Int16'),
+    })
+
+def write_leave_history_columnar(output_dir=None, file_format='parquet', chunk_size=EXPORT_CHUNK_SIZE, progress=None,
+                                 snapshot=False):
+    """
+    Streams the full leave history into a typed Parquet or Arrow IPC (Feather) dataset partitioned by
+    the year of LeaveStartDate. The dataset is built in a temporary directory and swapped in when
+    complete. Errors (including ImportError when pyarrow is missing) are raised, not printed.
+    progress and snapshot are as in write_leave_history_csv. Returns (rows, output_dir).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    arrow_format, default_dir = COLUMNAR_FORMATS[file_format]
+    output_dir = output_dir or default_dir
+    tmp_dir = output_dir + ".tmp"
+    schema = _leave_history_schema(pa)
+    written = {'rows': 0}
+
+    def report(rows):
+        written['rows'] = rows
+        if progress is not None:
+            progress(rows)
+
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        with read_connection(snapshot) as conn:
+            chunks = _reporting(iter_leave_history(conn, chunk_size), report)
+            batches = (pa.RecordBatch.from_pandas(_typed_chunk(chunk), schema=schema, preserve_index=False)
+                       for chunk in chunks)
+            ds.write_dataset(ds.Scanner.from_batches(batches, schema=schema), tmp_dir, format=arrow_format,
+                             partitioning=ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive'),
+                             max_rows_per_group=1 << 20)
+        if not os.path.exists(tmp_dir):
+            return 0, output_dir
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(tmp_dir, output_dir)
+        return written['rows'], output_dir
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def export_leave_history_columnar(output_dir=None, file_format='parquet', chunk_size=EXPORT_CHUNK_SIZE, snapshot=False):
+    """
+    Exports the leave history as a typed Parquet or Arrow IPC (Feather) dataset partitioned by the
+    year of LeaveStartDate. Chunks are streamed from SQLite straight into the dataset writer, and the
+    dataset is built in a temporary directory and swapped in when complete.
+    Requires the optional pyarrow package.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("Error: the parquet and feather formats require pyarrow. Install it with 'pip install pyarrow'.")
+        return
+
+    if not os.path.exists(DB_NAME):
+        print(f"Error: Database file '{DB_NAME}' not found. "
+              "Please ensure the main Streamlit application has been run at least once to create the database.")
+        return
+
+    try:
+        rows, output_dir = write_leave_history_columnar(output_dir, file_format, chunk_size, snapshot=snapshot)
+        if not rows:
+            print("No employee leave history found in the database.")
+            return
+        print(f"Success: Employee leave history has been exported to '{output_dir}' ({file_format}).")
+
+    except sqlite3.Error as e:
+        print(f"Database error occurred: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    export_employee_leave_history_to_csv()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export the employee leave history to CSV, Parquet or Arrow IPC.")
+    parser.add_argument("--format", choices=['csv', *COLUMNAR_FORMATS], default='csv',
+                        help="csv (default), or a typed dataset partitioned by start year: parquet, feather")
+    parser.add_argument("--output", help="file (csv) or directory (parquet/feather) to write")
+    parser.add_argument("--full", action="store_true", help="rebuild the whole CSV export instead of an incremental update")
+    parser.add_argument("--delta", action="store_true",
+                        help="write changed rows to a separate delta file instead of merging them into the CSV export")
+    parser.add_argument("--workers", type=int, help="run a full CSV export across this many processes")
+    parser.add_argument("--sharded", action="store_true",
+                        help="with --workers, keep one CSV file per partition instead of merging them")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="read a snapshot copy of the database (retaken when older than LEAVE_SNAPSHOT_MAX_AGE "
+                             "seconds) so the export never holds up the app's writers")
+    args = parser.parse_args()
+    if args.format != 'csv':
+        export_leave_history_columnar(args.output, args.format, snapshot=args.snapshot)
+    elif args.workers:
+        export_leave_history_parallel(args.output or CSV_FILE_NAME, args.workers, args.sharded, snapshot=args.snapshot)
+    elif args.full:
+        export_employee_leave_history_to_csv(args.output or CSV_FILE_NAME, snapshot=args.snapshot)
+    else:
+        export_leave_history_incremental(args.output or CSV_FILE_NAME, delta_only=args.delta, snapshot=args.snapshot)
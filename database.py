@@ -0,0 +1,231 @@
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentation
+
+# --- Constants ---
+# Name of the SQLite database file shared by the Streamlit app and the CLI scripts.
+# It can be overridden with the LEAVE_DB_NAME environment variable (useful for benchmarks).
+DB_NAME = os.environ.get("LEAVE_DB_NAME", "leave_management.db")
+
+# Maximum number of open connections kept per database file
+POOL_SIZE = 8
+
+# Seconds a thread waits for a free connection before giving up
+POOL_TIMEOUT = 10
+
+# Pragmas applied once, when a pooled connection is first opened.
+# WAL lets readers run alongside a writer, NORMAL sync is safe under WAL,
+# and the page cache / mmap keep hot pages out of the read() syscall path. temp_store is left at
+# its default (FILE) so large sorts, such as the export's ORDER BY, spill to disk instead of RAM.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Pragmas for read-only connections (see open_read_only); journal mode and sync are the writer's business.
+READ_ONLY_PRAGMAS = (
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+# --- Instrumented Connections ---
+# Every pooled connection is a TracedConnection. While instrumentation is enabled for the current
+# thread (see instrumentation.py) its statements run on TracedCursors, which record statement text,
+# duration and row counts; otherwise execute() and cursor() are the plain sqlite3 ones.
+
+class TracedCursor(sqlite3.Cursor):
+    """A cursor that times its statements and counts the rows fetched from them."""
+
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        # rowcount is the number of changed rows for DML and -1 for queries, whose rows are counted as fetched
+        self._record = instrumentation.record_query(sql, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._record = instrumentation.record_query(sql, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def _fetched(self, started, rows):
+        if self._record is not None:
+            instrumentation.record_fetch(self._record, time.perf_counter() - started, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(started, 1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """A connection whose cursors are TracedCursors while instrumentation is enabled."""
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = TracedCursor if instrumentation.enabled() else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if not instrumentation.enabled():
+            return super().execute(sql, parameters)
+        return self.cursor(TracedCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not instrumentation.enabled():
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(TracedCursor).executemany(sql, seq_of_parameters)
+
+# --- Connection Pool ---
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of long-lived SQLite connections.
+    Streamlit runs each script rerun on its own thread, so connections are opened with
+    check_same_thread=False and handed to one thread at a time.
+    """
+
+    def __init__(self, db_name, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = []
+
+    def _open(self):
+        """Opens a new (instrumented) connection and applies the tuning pragmas."""
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                               factory=TracedConnection)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Returns an idle connection, opening a new one while the pool is below max_size."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                conn = self._open()
+                self._created += 1
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a database connection to '{self.db_name}'.")
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything left uncommitted."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection for the duration of the block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Closes every connection opened by this pool."""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._created = 0
+            self._idle = queue.LifoQueue()
+
+
+def open_read_only(db_name=None):
+    """
+    Opens a separate, unpooled read-only connection (mode=ro), e.g. for a worker process that only
+    reads. The caller closes it.
+    """
+    uri = pathlib.Path(os.path.abspath(db_name or DB_NAME)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in READ_ONLY_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_name=None):
+    """Returns the process-wide pool for a database file, creating it on first use."""
+    db_name = db_name or DB_NAME
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = ConnectionPool(db_name)
+        return pool
+
+def connection(db_name=None):
+    """Borrows a pooled connection: `with connection() as conn: ...`."""
+    return get_pool(db_name).connection()
+
+@contextmanager
+def transaction(db_name=None):
+    """
+    Borrows a pooled connection and runs the block as one write transaction.
+    BEGIN IMMEDIATE takes the write lock before the first read, so read-check-write sequences
+    cannot interleave with another writer. Commits on success and rolls back on any exception.
+    """
+    with connection(db_name) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def close_pools():
+    """Closes all pooled connections (e.g. before deleting or replacing a database file)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
@@ -1,82 +1,124 @@
+import argparse
+import json
 import sqlite3
+import sys
 import os
 
+from snapshot import read_connection
+
 # --- Constants ---
-# Name of the SQLite database file
-DB_NAME = "leave_management.db"
+# Name of the SQLite database file, shared with the Streamlit app
+from database import DB_NAME
+
+# Rows per fetchmany() call while streaming the listing
+FETCH_SIZE = 500
 
-# --- Database Connection Function ---
+OUTPUT_FORMATS = ('text', 'jsonl')
 
-def get_connection():
+# --- Search ---
+
+def fts_query(text):
     """
-    Establishes a connection to the SQLite database.
-    The row_factory is set to sqlite3.Row to allow accessing columns by name.
+    Turns free text into a safe FTS5 query: every word is quoted (so FTS syntax in the input is
+    matched literally) and prefix-matched, and all words must match, e.g. 'ann smi' finds "Anna Smith".
     """
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+    words = text.split()
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+def iter_employees(conn, name=None, role=None, reason=None, limit=None, fetch_size=FETCH_SIZE):
+    """
+    Streams employees (emp_id, name, role) in name order, fetchmany() at a time.
+    name matches employee names and reason matches the reason of any of the employee's leave
+    requests; both are full-text searches on the FTS5 indexes. role filters exactly.
+    """
+    conditions, params = [], []
+    if name and name.strip():
+        conditions.append("e.emp_id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?)")
+        params.append(fts_query(name))
+    if role:
+        conditions.append("e.role = ?")
+        params.append(role.strip().lower())
+    if reason and reason.strip():
+        conditions.append("e.emp_id IN (SELECT lr.emp_id FROM leave_reasons_fts f "
+                          "JOIN leave_requests lr ON lr.leave_id = f.rowid WHERE leave_reasons_fts MATCH ?)")
+        params.append(fts_query(reason))
+    # Data is ordered by name for readability (idx_employees_name, so rows stream without a sort).
+    query = '''
+        SELECT
+            e.emp_id AS EmployeeID,
+            e.name AS EmployeeName,
+            e.role AS EmployeeRole
+        FROM employees e
+    '''
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY e.name ASC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    c = conn.execute(query, params)
+    while True:
+        rows = c.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
 
 # --- Data Display Function ---
 
-def display_employee_data_in_terminal():
+def display_employee_data_in_terminal(name=None, role=None, reason=None, limit=None, output_format='text',
+                                      out=sys.stdout, snapshot=False):
     """
-    Connects to the database, fetches all employee details (ID, Name, Role),
-    and prints them directly to the terminal.
+    Connects to the database, streams the matching employee details (ID, Name, Role),
+    and prints them directly to the terminal, as a table or as JSON lines.
+    snapshot=True reads the snapshot copy (see snapshot.py) instead of the live database.
     """
     # Check if the database file exists before attempting to connect
     if not os.path.exists(DB_NAME):
-        print(f"Error: Database file '{DB_NAME}' not found.")
-        print("Please ensure your Streamlit application has been run at least once to create and populate the database.")
+        print(f"Error: Database file '{DB_NAME}' not found.", file=sys.stderr)
+        print("Please ensure your Streamlit application has been run at least once to create and populate the database.",
+              file=sys.stderr)
         return
 
-    conn = None # Initialize connection to None
     try:
-        conn = get_connection()
-        c = conn.cursor()
-
-        # SQL query to select only employee-specific data: ID, Name, and Role.
-        # Data is ordered by name for readability.
-        c.execute('''
-            SELECT
-                emp_id AS EmployeeID,
-                name AS EmployeeName,
-                role AS EmployeeRole
-            FROM employees
-            ORDER BY name ASC
-        ''')
-        rows = c.fetchall()
-
-        # If no employee data is found, inform the user.
-        if not rows:
-            print("No employee data found in the database.")
-            return
-
-        print("\n--- Employee Data ---")
-        print(f"{'ID':<5} {'Name':<25} {'Role':<15}") # Header for terminal output
-        print("-" * 45) # Separator line
-
-        # Iterate through each fetched row and print its details.
-        for row in rows:
-            # Access columns by their aliases defined in the SQL query
-            employee_id = row['EmployeeID']
-            employee_name = row['EmployeeName']
-            employee_role = row['EmployeeRole']
-            print(f"{employee_id:<5} {employee_name:<25} {employee_role:<15}")
+        # Borrow a long-lived connection from the shared pool (or open the snapshot) for the duration of the query
+        with read_connection(snapshot) as conn:
+            count = 0
+            for row in iter_employees(conn, name, role, reason, limit):
+                if output_format == 'jsonl':
+                    out.write(json.dumps({'emp_id': row['EmployeeID'], 'name': row['EmployeeName'],
+                                          'role': row['EmployeeRole']}) + "\n")
+                else:
+                    if count == 0:
+                        print("\n--- Employee Data ---", file=out)
+                        print(f"{'ID':<5} {'Name':<25} {'Role':<15}", file=out) # Header for terminal output
+                        print("-" * 45, file=out) # Separator line
+                    print(f"{row['EmployeeID']:<5} {row['EmployeeName']:<25} {row['EmployeeRole']:<15}", file=out)
+                count += 1
 
-        print("---------------------\n")
+            # If no employee data is found, inform the user.
+            if output_format == 'text':
+                if count:
+                    print(f"--- {count} employees ---\n", file=out)
+                else:
+                    print("No matching employee data found in the database.", file=out)
 
     except sqlite3.Error as e:
         # Catch and report any SQLite specific errors during database operations.
-        print(f"Database error occurred: {e}")
+        print(f"Database error occurred: {e}", file=sys.stderr)
     except Exception as e:
         # Catch and report any other unexpected errors.
-        print(f"An unexpected error occurred: {e}")
-    finally:
-        # Ensure the database connection is always closed.
-        if conn:
-            conn.close()
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
 
 # --- Script Entry Point ---
 
 if __name__ == "__main__":
-    display_employee_data_in_terminal()
+    parser = argparse.ArgumentParser(description="List employees, optionally filtered by name, role or leave reason.")
+    parser.add_argument("--name", help="full-text search on employee names (prefixes match, e.g. 'ann smi')")
+    parser.add_argument("--role", choices=['employee', 'manager'])
+    parser.add_argument("--reason", help="only employees with a leave request whose reason matches (full-text)")
+    parser.add_argument("--limit", type=int, help="print at most this many employees")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='text', help="text table (default) or JSON lines")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="read a snapshot copy of the database (retaken when older than LEAVE_SNAPSHOT_MAX_AGE seconds)")
+    args = parser.parse_args()
+    display_employee_data_in_terminal(args.name, args.role, args.reason, args.limit, args.format, snapshot=args.snapshot)
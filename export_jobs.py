@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from database import connection
+from instrumentation import timed
+from query_cache import bump_data_version, cached_query
+
+# --- Constants ---
+# Finished exports are written here: one CSV file, or one zip archive of the Parquet / Feather dataset, per job.
+# It can be overridden with the LEAVE_EXPORT_DIR environment variable.
+EXPORT_DIR = os.environ.get("LEAVE_EXPORT_DIR", "exports")
+
+EXPORT_FORMATS = ('csv', 'parquet', 'feather')
+
+# At most this many exports run at once; further jobs wait in the queue
+EXPORT_WORKERS = 2
+
+# "thread" runs exports on a thread pool inside the app process. "process" runs them in worker
+# processes, so their pandas work never competes with Streamlit reruns for the GIL. Job state lives
+# in SQLite either way. It can be overridden with the LEAVE_EXPORT_POOL environment variable.
+EXPORT_POOL = os.environ.get("LEAVE_EXPORT_POOL", "thread")
+
+# Progress is written to the export_jobs table at most this often (seconds)
+PROGRESS_INTERVAL = 0.5
+
+# A queued or running job whose progress has not moved for this long is reported as interrupted
+# (e.g. the app was restarted while it ran)
+STALE_JOB_SECONDS = 300
+
+# Only the newest jobs are kept; older jobs and their files are pruned when a new job starts
+JOBS_KEPT = 20
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# --- Export Jobs ---
+# A job is a row in export_jobs (status, rows done / total, output file, error) plus a task on a
+# process-wide pool. The task writes its progress back to the row, so the portal only polls one
+# indexed table and every app instance sees the same job list. The Streamlit script thread never
+# waits on an export.
+#
+# Job lists are served from the query cache, so reruns with no active job do not touch SQLite.
+# Starting a job and a job finishing (its future's done callback, which runs in the app process for
+# either pool) bump the data version; progress updates do not, as they would flush the whole cache
+# twice a second. While a job is active the portal polls poll_export_jobs() instead.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Returns the process-wide export pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if EXPORT_POOL == "process":
+                _executor = ProcessPoolExecutor(EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                _executor = ThreadPoolExecutor(EXPORT_WORKERS, thread_name_prefix="leave-export")
+        return _executor
+
+def _now():
+    return datetime.now().isoformat()
+
+def _update_job(job_id, **fields):
+    """Writes the given columns of one job (and its updated_on heartbeat) in a short transaction."""
+    fields['updated_on'] = _now()
+    assignments = ', '.join(f"{column} = ?" for column in fields)
+    with connection() as conn:
+        conn.execute(f'UPDATE export_jobs SET {assignments} WHERE job_id = ?', [*fields.values(), job_id])
+        conn.commit()
+
+def _job_output_path(job_id, file_format):
+    """The file a finished job is downloaded from."""
+    extension = 'csv' if file_format == 'csv' else f'{file_format}.zip'
+    return os.path.join(EXPORT_DIR, f"leave_history_{job_id}.{extension}")
+
+def _progress_reporter(job_id):
+    """Returns a progress(rows) callback that records the job's progress, throttled to PROGRESS_INTERVAL."""
+    last = {'at': 0.0}
+
+    def progress(rows):
+        now = time.monotonic()
+        if now - last['at'] >= PROGRESS_INTERVAL:
+            last['at'] = now
+            _update_job(job_id, rows_done=rows)
+    return progress
+
+def run_export_job(job_id, file_format):
+    """
+    Runs one export job to completion (on a pool worker). Columnar datasets are written to a directory
+    and packed into a single zip archive for download. Failures are recorded on the job, not raised.
+    """
+    output_path = _job_output_path(job_id, file_format)
+    try:
+        # Imported here so starting the app (and each worker process) does not pay for pandas
+        from check_employee_leave import count_leave_history, write_leave_history_columnar, write_leave_history_csv
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with connection() as conn:
+            rows_total = count_leave_history(conn)
+        _update_job(job_id, status='running', started_on=_now(), rows_total=rows_total)
+        progress = _progress_reporter(job_id)
+        if file_format == 'csv':
+            rows, _ = write_leave_history_csv(output_path, progress=progress)
+        else:
+            dataset_dir = os.path.join(EXPORT_DIR, f"leave_history_{job_id}.{file_format}")
+            rows, _ = write_leave_history_columnar(dataset_dir, file_format, progress=progress)
+            if rows:
+                shutil.make_archive(output_path[:-len('.zip')], 'zip', dataset_dir)
+            shutil.rmtree(dataset_dir, ignore_errors=True)
+        if not rows:
+            _update_job(job_id, status='failed', finished_on=_now(), error="No employee leave history found.")
+            return
+        _update_job(job_id, status='done', finished_on=_now(), rows_done=rows, output_path=output_path)
+    except ImportError as e:
+        _update_job(job_id, status='failed', finished_on=_now(),
+                    error=f"The {file_format} export needs the '{e.name}' package. Install it with 'pip install {e.name}'.")
+    except Exception as e:
+        _update_job(job_id, status='failed', finished_on=_now(), error=f"{type(e).__name__}: {e}")
+
+def _prune_jobs(conn):
+    """Deletes all but the newest JOBS_KEPT finished jobs, and their files."""
+    old = conn.execute(f'''
+        SELECT job_id, output_path FROM export_jobs
+        WHERE status NOT IN ({', '.join('?' for _ in ACTIVE_STATUSES)})
+        ORDER BY job_id DESC LIMIT -1 OFFSET ?
+    ''', (*ACTIVE_STATUSES, JOBS_KEPT)).fetchall()
+    for job in old:
+        if job['output_path'] and os.path.exists(job['output_path']):
+            os.remove(job['output_path'])
+    conn.executemany('DELETE FROM export_jobs WHERE job_id = ?', [(job['job_id'],) for job in old])
+
+@timed
+def start_export_job(requested_by, file_format='csv'):
+    """Queues an export of the full leave history and returns immediately with (success, message)."""
+    if file_format not in EXPORT_FORMATS:
+        return False, f"Unknown export format '{file_format}'."
+    now = _now()
+    with connection() as conn:
+        job_id = conn.execute('INSERT INTO export_jobs (requested_by, format, status, created_on, updated_on) '
+                              "VALUES (?, ?, 'queued', ?, ?)", (requested_by, file_format, now, now)).lastrowid
+        _prune_jobs(conn)
+        conn.commit()
+    bump_data_version()
+    future = _get_executor().submit(run_export_job, job_id, file_format)
+    future.add_done_callback(lambda _: bump_data_version())
+    return True, f"Export #{job_id} ({file_format}) started."
+
+@timed
+def poll_export_jobs(limit=10):
+    """
+    Returns the newest export jobs, newest first, always read from the database (for progress while a
+    job is active). Active jobs whose progress stopped moving more than STALE_JOB_SECONDS ago are marked
+    as failed first, so a job killed by a restart does not spin forever.
+    """
+    stale_before = (datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)).isoformat()
+    with connection() as conn:
+        jobs = conn.execute('SELECT * FROM export_jobs ORDER BY job_id DESC LIMIT ?', (limit,)).fetchall()
+        stale = [(job['job_id'],) for job in jobs
+                 if job['status'] in ACTIVE_STATUSES and job['updated_on'] < stale_before]
+        if not stale:
+            return jobs
+        conn.executemany("UPDATE export_jobs SET status = 'failed', error = 'Interrupted.' "
+                         "WHERE job_id = ? AND status IN ('queued', 'running')", stale)
+        conn.commit()
+        jobs = conn.execute('SELECT * FROM export_jobs ORDER BY job_id DESC LIMIT ?', (limit,)).fetchall()
+    bump_data_version()
+    return jobs
+
+@timed
+@cached_query
+def get_export_jobs(limit=10):
+    """The newest export jobs as poll_export_jobs returns them, served from the query cache."""
+    return poll_export_jobs(limit)
+
+@timed
+@cached_query
+def has_active_export_jobs():
+    """True while any export job is queued or running (the portal polls for progress only then)."""
+    with connection() as conn:
+        return conn.execute(f"SELECT 1 FROM export_jobs WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)}) "
+                            "LIMIT 1", ACTIVE_STATUSES).fetchone() is not None
+
+def export_job_file(job):
+    """Returns the path of a finished job's file, or None if the job is not done or the file is gone."""
+    path = job['output_path']
+    if job['status'] == 'done' and path and os.path.exists(path):
+        return path
+    return None
@@ -0,0 +1,272 @@
+import argparse
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from absence import rebuild_absences
+from database import transaction
+from leave_service import MAX_CONSECUTIVE_DAYS, MAX_LEAVE_PER_YEAR
+from migrations import migrate
+from query_cache import bump_data_version
+
+# --- Constants ---
+# Size of the first/last name pools drawn from Faker once per run; names are combined from these
+# pools with NumPy instead of calling Faker per row.
+NAME_POOL_SIZE = 500
+
+# Years of leave history generated, ending at today + FUTURE_DAYS
+HISTORY_YEARS = 5
+FUTURE_DAYS = 90
+
+# Relative weight of a leave starting in each month (summer and December peaks)
+MONTH_WEIGHTS = np.array([6, 5, 7, 8, 8, 12, 14, 13, 7, 7, 6, 15], dtype=float)
+
+# Probability a request lasts 1..MAX_CONSECUTIVE_DAYS days (mostly short)
+DURATION_WEIGHTS = np.array([30, 20, 12, 8, 10, 5, 4, 3, 3, 5], dtype=float)
+
+# Status mix for requests whose start date has passed; future requests are mostly still pending
+PAST_STATUS_WEIGHTS = {'approved': 0.85, 'rejected': 0.12, 'pending': 0.03}
+FUTURE_STATUS_WEIGHTS = {'approved': 0.35, 'rejected': 0.05, 'pending': 0.60}
+
+LEAVE_REASONS = [
+    None, "Vacation", "Family event", "Medical appointment", "Sick leave", "Personal errand",
+    "Wedding", "Moving house", "Conference travel", "Child care", "Public holiday bridge",
+    "Vacation\nOut of office, limited access to email",
+]
+
+# --- Generator ---
+
+def _name_pool(rng, seed, count):
+    """Returns count "First Last" names combined from Faker pools built once with a fixed seed."""
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(seed)
+    first = np.array([fake.first_name() for _ in range(NAME_POOL_SIZE)], dtype=object)
+    last = np.array([fake.last_name() for _ in range(NAME_POOL_SIZE)], dtype=object)
+    return first[rng.integers(0, NAME_POOL_SIZE, count)] + " " + last[rng.integers(0, NAME_POOL_SIZE, count)]
+
+def _window(today):
+    """The first and last possible start date of a generated request, as datetime64[D]."""
+    return np.datetime64(date(today.year - HISTORY_YEARS, 1, 1)), np.datetime64(today) + np.timedelta64(FUTURE_DAYS, 'D')
+
+def _leave_dates(rng, count, today):
+    """Draws start dates over the history window with month seasonality and weekday starts."""
+    first_day, last_day = _window(today)
+    days = np.arange(first_day, last_day + np.timedelta64(1, 'D'))
+    months = days.astype('datetime64[M]').astype(int) % 12
+    weekdays = (days.astype('datetime64[D]').astype(int) + 3) % 7  # 0 = Monday
+    weights = MONTH_WEIGHTS[months] * np.where(weekdays < 5, 1.0, 0.1)
+    return rng.choice(days, size=count, p=weights / weights.sum())
+
+def _group_starts(*keys):
+    """For rows sorted by keys: a mask of each group's first row and each row's group number."""
+    first = np.zeros(len(keys[0]), dtype=bool)
+    first[:1] = True
+    for key in keys:
+        first[1:] |= key[1:] != key[:-1]
+    return first, np.cumsum(first) - 1
+
+def _spread_per_employee(emp_index, start, duration):
+    """
+    Moves start dates so that no two requests of an employee overlap: in each employee's start order,
+    a request that begins before the previous one has ended starts the day after it instead.
+    Vectorized as a running maximum per employee: with `before` the employee's days of leave requested
+    before a request, its new start is before + max(start - before) over the employee's requests so far.
+    """
+    order = np.lexsort((start, emp_index))
+    emp, days, dur = emp_index[order], start[order].astype(np.int64), duration[order].astype(np.int64)
+    first, group = _group_starts(emp)
+    requested = np.cumsum(dur) - dur
+    before = requested - requested[first][group]
+    key = days - before
+    # Lift every employee's keys above the previous employee's, so one accumulate restarts per employee
+    offset = group * (key.max() - key.min() + 1) if len(key) else group
+    spread = np.empty_like(start)
+    spread[order] = (before + np.maximum.accumulate(key + offset) - offset).astype('datetime64[D]')
+    return spread
+
+def _cap_approved(emp_index, start, duration, statuses):
+    """Rejects approved requests beyond MAX_LEAVE_PER_YEAR approved days per employee and start year."""
+    year = start.astype('datetime64[Y]').astype(np.int64)
+    order = np.lexsort((start, year, emp_index))
+    days = np.where(statuses == 'approved', duration, 0)[order]
+    first, group = _group_starts(emp_index[order], year[order])
+    total = np.cumsum(days)
+    within = total - (total - days)[first][group]
+    over = order[(days > 0) & (within > MAX_LEAVE_PER_YEAR)]
+    statuses[over] = 'rejected'
+
+def _cap_pending(emp_index, start, duration, statuses, today):
+    """
+    Leaves each employee at most one pending request, one their final balance covers, as approve_leave
+    requires; the others are rejected. The latest-starting such request is kept. The balance is the
+    yearly allowance minus the days approved from this year on, as the ledger entries below book it.
+    """
+    this_year = start >= np.datetime64(date(today.year, 1, 1))
+    approved = np.bincount(emp_index, weights=np.where((statuses == 'approved') & this_year, duration, 0),
+                           minlength=int(emp_index.max()) + 1 if len(emp_index) else 0)
+    balance = MAX_LEAVE_PER_YEAR - np.minimum(approved, MAX_LEAVE_PER_YEAR)
+    pending = np.flatnonzero(statuses == 'pending')
+    fits = pending[duration[pending] <= balance[emp_index[pending]]]
+    order = fits[np.lexsort((start[fits], emp_index[fits]))]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = emp_index[order][1:] != emp_index[order][:-1]
+    statuses[pending] = 'rejected'
+    statuses[order[last]] = 'pending'
+
+def _statuses(rng, start, today):
+    """Picks a status per request from the past or future mix depending on its start date."""
+    future = start >= np.datetime64(today)
+    statuses = np.empty(len(start), dtype=object)
+    for mask, mix in ((~future, PAST_STATUS_WEIGHTS), (future, FUTURE_STATUS_WEIGHTS)):
+        statuses[mask] = rng.choice(list(mix), size=int(mask.sum()), p=list(mix.values()))
+    return statuses
+
+def generate(num_employees, num_requests, seed=0, manager_ratio=0.05, overlap_rate=0.02, append=False):
+    """
+    Fills the database with num_employees employees and num_requests leave requests.
+    Everything is drawn with NumPy from a single seed (so runs are reproducible) and inserted with
+    executemany in one transaction. The history follows the app's rules: an employee's requests do not
+    overlap and at most MAX_LEAVE_PER_YEAR days per year are approved (later requests are rejected).
+    Then a fraction overlap_rate of requests is made to deliberately overlap another request of the
+    same employee; those are rejected, as the app's overlap check never lets one be pending or approved.
+    Each employee ends with at most one pending request, which their balance covers, so approve_leave
+    succeeds on it. Balances are ledger entries: MAX_LEAVE_PER_YEAR accrued minus the days approved
+    this year. Unless append is True, existing data is wiped.
+    Returns a dict with the number of employees and leave requests inserted.
+    Raises ValueError for negative counts, rates outside [0, 1], or leave requests without employees.
+    """
+    if num_employees < 0 or num_requests < 0:
+        raise ValueError("The numbers of employees and leave requests cannot be negative.")
+    if num_requests and not num_employees:
+        raise ValueError("Leave requests need at least one employee.")
+    if not 0 <= manager_ratio <= 1 or not 0 <= overlap_rate <= 1:
+        raise ValueError("The manager ratio and the overlap rate must be between 0 and 1.")
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    num_managers = max(1, round(num_employees * manager_ratio)) if num_employees else 0
+
+    names = _name_pool(rng, seed, num_employees)
+    roles = ['manager'] * num_managers + ['employee'] * (num_employees - num_managers)
+
+    # Leave requests, drawn column by column
+    emp_index = rng.integers(0, num_employees, num_requests) if num_employees else np.empty(0, dtype=int)
+    start = _leave_dates(rng, num_requests, today)
+    duration = rng.choice(np.arange(1, MAX_CONSECUTIVE_DAYS + 1), size=num_requests,
+                          p=DURATION_WEIGHTS / DURATION_WEIGHTS.sum())
+    start = _spread_per_employee(emp_index, start, duration)
+    statuses = _statuses(rng, start, today)
+    # Spreading can push an employee's last requests past the window; those start on its last day
+    # instead and, overlapping, are rejected
+    last_day = _window(today)[1]
+    late = start > last_day
+    start[late] = last_day
+    statuses[late] = 'rejected'
+    _cap_approved(emp_index, start, duration, statuses)
+
+    # Deliberate overlaps: copy another request's employee and shift its dates by up to two days,
+    # staying inside the history window
+    overlaps = np.flatnonzero(rng.random(num_requests) < overlap_rate)
+    if len(overlaps):
+        source = rng.integers(0, num_requests, len(overlaps))
+        emp_index[overlaps] = emp_index[source]
+        shifted = start[source] + rng.integers(-2, 3, len(overlaps)).astype('timedelta64[D]')
+        start[overlaps] = np.clip(shifted, *_window(today))
+        statuses[overlaps] = 'rejected'
+    _cap_pending(emp_index, start, duration, statuses, today)
+
+    end = start + (duration - 1).astype('timedelta64[D]')
+    # Applied 0-60 days ahead during office hours; processed 0-5 days later (never in the future)
+    now = np.datetime64(datetime.now(), 's')
+    applied = (start.astype('datetime64[s]') - rng.integers(0, 61, num_requests).astype('timedelta64[D]')
+               + rng.integers(8 * 3600, 19 * 3600, num_requests).astype('timedelta64[s]'))
+    applied = np.minimum(applied, now)
+    processed = np.minimum(applied + rng.integers(3600, 5 * 86400, num_requests).astype('timedelta64[s]'), now)
+    reasons = np.array(LEAVE_REASONS, dtype=object)[rng.integers(0, len(LEAVE_REASONS), num_requests)]
+
+    start_str = start.astype(str)
+    end_str = end.astype(str)
+    applied_str = applied.astype(str)
+    processed_str = np.where(statuses == 'pending', None, processed.astype(str))
+
+    migrate()
+    with transaction() as conn:
+        # The full-text triggers on leave_requests are suspended for the load (and the wipe) and the
+        # search index is rebuilt once at the end, instead of being updated row by row
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                "AND tbl_name = 'leave_requests'").fetchall()
+        for trigger in triggers:
+            conn.execute(f'DROP TRIGGER {trigger["name"]}')
+        if not append:
+            conn.execute('DELETE FROM leave_ledger')
+            conn.execute('DELETE FROM leave_balances')
+            conn.execute('DELETE FROM leave_requests')
+            conn.execute('DELETE FROM employees')
+            # Restart the AUTOINCREMENT counters so the same seed also reproduces the same IDs
+            conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('employees', 'leave_requests', 'leave_ledger')")
+        # Balances start at 0 and are set by the ledger entries inserted below
+        conn.executemany('INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, 0)',
+                         zip(names.tolist(), roles))
+        # Inside this write transaction the most recently inserted rows are ours
+        emp_ids = np.array([row[0] for row in conn.execute(
+            'SELECT emp_id FROM employees ORDER BY emp_id DESC LIMIT ?', (num_employees,))][::-1], dtype=np.int64)
+        # Loading into un-indexed storage and building each index once afterwards (a sort) is far
+        # faster than updating every secondary index row by row in random key order.
+        indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                               "AND tbl_name = 'leave_requests' AND sql IS NOT NULL").fetchall()
+        for index in indexes:
+            conn.execute(f'DROP INDEX {index["name"]}')
+        conn.executemany('''
+            INSERT INTO leave_requests (emp_id, start_date, end_date, leave_reason, status, applied_on, processed_on)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', zip(emp_ids[emp_index].tolist(), start_str.tolist(), end_str.tolist(), reasons.tolist(),
+                 statuses.tolist(), applied_str.tolist(), processed_str.tolist()))
+        for index in indexes:
+            conn.execute(index['sql'])
+        for trigger in triggers:
+            conn.execute(trigger['sql'])
+        conn.execute("INSERT INTO leave_reasons_fts (leave_reasons_fts) VALUES ('rebuild')")
+        # Two set-based ledger inserts: this year's allowance for every new employee, then one deduction
+        # each for the days approved this year (capped at the allowance). The ledger triggers set the balances.
+        first_emp_id = int(emp_ids[0]) if num_employees else 0
+        created_on = datetime.now().isoformat()
+        conn.execute('''
+            INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+            SELECT emp_id, ?, 'accrual', ?, 'Yearly allowance', ? FROM employees WHERE emp_id >= ?
+        ''', (today.year, MAX_LEAVE_PER_YEAR, created_on, first_emp_id))
+        conn.execute('''
+            INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+            SELECT lr.emp_id, ?, 'deduction',
+                   -MIN(?, CAST(SUM(julianday(lr.end_date) - julianday(lr.start_date) + 1) AS INTEGER)),
+                   'Approved leave (generated history)', ?
+            FROM leave_requests lr
+            WHERE lr.emp_id >= ? AND lr.status = 'approved' AND lr.start_date >= ?
+            GROUP BY lr.emp_id
+        ''', (today.year, MAX_LEAVE_PER_YEAR, created_on, first_emp_id, f"{today.year}-01-01"))
+        # The daily absence index is rebuilt set-based from all approved requests
+        rebuild_absences(conn)
+        conn.execute('PRAGMA analysis_limit = 1000')
+        conn.execute('ANALYZE')
+    bump_data_version()
+    return {'employees': num_employees, 'leave_requests': num_requests}
+
+# --- Script Entry Point ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate reproducible synthetic employees and leave requests.")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--manager-ratio", type=float, default=0.05)
+    parser.add_argument("--overlap-rate", type=float, default=0.02)
+    parser.add_argument("--append", action="store_true", help="keep existing data instead of wiping it")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    try:
+        counts = generate(args.employees, args.requests, args.seed, args.manager_ratio, args.overlap_rate, args.append)
+    except ValueError as e:
+        print(f"Error: {e}")
+    else:
+        print(f"Generated {counts['employees']} employees and {counts['leave_requests']} leave requests "
+              f"in {time.perf_counter() - started:.1f}s.")
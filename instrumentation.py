@@ -0,0 +1,164 @@
+import functools
+import json
+import re
+import threading
+import time
+
+# --- Constants ---
+# Statement text is whitespace-collapsed and cut to this many characters in traces and metric labels
+STATEMENT_LABEL_LENGTH = 160
+
+# Prefix of every exported Prometheus metric name
+METRIC_PREFIX = "leave_tracker"
+
+# --- Query and Rerun Instrumentation ---
+# Recording is off unless it has been switched on globally (set_enabled, e.g. for a benchmark) or a
+# trace has been started on the current thread (start_trace, e.g. by the Streamlit "Performance"
+# panel for one rerun). When off, the instrumented connections in database.py fall straight through
+# to sqlite3 and the timed() hooks only pay for one check, so the cost stays off the hot path.
+#
+# A trace holds every statement (text, duration, rows) and timed function call made on its thread
+# since it started. Independently of traces, totals per statement and per function are accumulated
+# process-wide for export as JSON or Prometheus text.
+
+_lock = threading.Lock()
+_local = threading.local()
+_enabled = False
+_queries = {}
+_functions = {}
+_reruns = {'count': 0, 'seconds': 0.0}
+
+def set_enabled(flag):
+    """Switches recording on or off for every thread of the process."""
+    global _enabled
+    _enabled = bool(flag)
+
+def enabled():
+    """True if statements and timed calls made on the current thread are being recorded."""
+    return _enabled or getattr(_local, 'trace', None) is not None
+
+def start_trace():
+    """Starts recording on the current thread and returns the new (empty) trace."""
+    _local.trace = {'started': time.perf_counter(), 'queries': [], 'calls': []}
+    return _local.trace
+
+def current_trace():
+    """Returns the trace being recorded on the current thread, or None."""
+    return getattr(_local, 'trace', None)
+
+def stop_trace():
+    """Stops recording on the current thread, counts it as one rerun and returns the finished trace."""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    if trace is not None:
+        trace['seconds'] = time.perf_counter() - trace['started']
+        with _lock:
+            _reruns['count'] += 1
+            _reruns['seconds'] += trace['seconds']
+    return trace
+
+def statement_label(sql):
+    """Collapses whitespace and shortens a statement for display and as a metric label."""
+    label = re.sub(r"\s+", " ", sql).strip()
+    return label if len(label) <= STATEMENT_LABEL_LENGTH else label[:STATEMENT_LABEL_LENGTH - 3] + "..."
+
+def record_query(sql, seconds, rows):
+    """
+    Records one executed statement and returns its trace record. Rows read later through the cursor
+    are added with record_fetch.
+    """
+    record = {'sql': statement_label(sql), 'seconds': seconds, 'rows': rows}
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace['queries'].append(record)
+    with _lock:
+        totals = _queries.setdefault(record['sql'], {'count': 0, 'seconds': 0.0, 'rows': 0})
+        totals['count'] += 1
+        totals['seconds'] += seconds
+        totals['rows'] += rows
+    return record
+
+def record_fetch(record, seconds, rows):
+    """Adds time spent and rows returned while fetching from a statement's cursor."""
+    record['seconds'] += seconds
+    record['rows'] += rows
+    with _lock:
+        totals = _queries[record['sql']]
+        totals['seconds'] += seconds
+        totals['rows'] += rows
+
+def timed(func):
+    """
+    Decorator that records the duration of each call, and the number of statements it issued, while
+    recording is enabled. Put it outermost so cache hits show up as calls without statements.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled():
+            return func(*args, **kwargs)
+        trace = getattr(_local, 'trace', None)
+        queries_before = len(trace['queries']) if trace is not None else 0
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            if trace is not None:
+                trace['calls'].append({'function': name, 'seconds': seconds,
+                                       'queries': len(trace['queries']) - queries_before})
+            with _lock:
+                totals = _functions.setdefault(name, {'count': 0, 'seconds': 0.0})
+                totals['count'] += 1
+                totals['seconds'] += seconds
+    return wrapper
+
+# --- Export ---
+
+def metrics():
+    """Returns a snapshot of the process-wide totals per statement, per function and for reruns."""
+    with _lock:
+        return {
+            'queries': {sql: dict(totals) for sql, totals in _queries.items()},
+            'functions': {name: dict(totals) for name, totals in _functions.items()},
+            'reruns': dict(_reruns),
+        }
+
+def reset_metrics():
+    """Clears the process-wide totals (traces in progress are unaffected)."""
+    with _lock:
+        _queries.clear()
+        _functions.clear()
+        _reruns.update(count=0, seconds=0.0)
+
+def metrics_json(trace=None):
+    """The totals, plus an optional finished trace, as a JSON document."""
+    snapshot = metrics()
+    if trace is not None:
+        snapshot['trace'] = {key: value for key, value in trace.items() if key != 'started'}
+    return json.dumps(snapshot, indent=2)
+
+def _label_value(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def metrics_prometheus():
+    """The totals in the Prometheus text exposition format."""
+    snapshot = metrics()
+    families = [
+        ("query_calls_total", "Statements executed, by statement text.", 'queries', 'statement', 'count'),
+        ("query_seconds_total", "Time spent executing and fetching, by statement text.", 'queries', 'statement', 'seconds'),
+        ("query_rows_total", "Rows returned or changed, by statement text.", 'queries', 'statement', 'rows'),
+        ("function_calls_total", "Calls of timed helper functions.", 'functions', 'function', 'count'),
+        ("function_seconds_total", "Time spent in timed helper functions.", 'functions', 'function', 'seconds'),
+    ]
+    lines = []
+    for name, help_text, section, label, field in families:
+        lines += [f"# HELP {METRIC_PREFIX}_{name} {help_text}", f"# TYPE {METRIC_PREFIX}_{name} counter"]
+        for key, totals in sorted(snapshot[section].items()):
+            lines.append(f'{METRIC_PREFIX}_{name}{{{label}="{_label_value(key)}"}} {totals[field]}')
+    for name, help_text, field in (("reruns_total", "Traced script reruns.", 'count'),
+                                   ("rerun_seconds_total", "Time spent in traced script reruns.", 'seconds')):
+        lines += [f"# HELP {METRIC_PREFIX}_{name} {help_text}", f"# TYPE {METRIC_PREFIX}_{name} counter",
+                  f"{METRIC_PREFIX}_{name} {snapshot['reruns'][field]}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+import argparse
+import sys
+from datetime import date, datetime
+
+from database import connection, transaction
+from instrumentation import timed
+from leave_service import MAX_LEAVE_PER_YEAR
+from migrations import migrate
+from query_cache import bump_data_version, cached_query
+
+# --- Constants ---
+# Unused days an employee may carry into the next year; the rest expire at the yearly rollover
+MAX_CARRYOVER_DAYS = 5
+
+# --- Leave Ledger ---
+# Every change to a balance is an append-only row in leave_ledger: accruals (+), deductions for
+# approved leave (-, linked to the request) and manual or rollover adjustments (+/-). Triggers
+# (migration 6) keep two aggregates in step with every insert, inside the same transaction:
+#   employees.leave_balance   running total of the employee's entries (the current balance)
+#   leave_balances            per employee and year: days accrued, deducted and adjusted
+# so reading a balance never scans history, and verify_balances() can rebuild both from the ledger.
+
+@timed
+@cached_query
+def get_yearly_balance(emp_id, year=None):
+    """Returns the (accrued, deducted, adjusted) totals of an employee's ledger for a year (default: this year)."""
+    year = year or date.today().year
+    with connection() as conn:
+        row = conn.execute('SELECT accrued, deducted, adjusted FROM leave_balances WHERE emp_id = ? AND year = ?',
+                           (emp_id, year)).fetchone()
+    return tuple(row) if row else (0, 0, 0)
+
+@timed
+@cached_query
+def get_ledger(emp_id, year=None):
+    """Returns an employee's ledger entries, oldest first, optionally for a single year."""
+    with connection() as conn:
+        if year is None:
+            return conn.execute('SELECT * FROM leave_ledger WHERE emp_id = ? ORDER BY entry_id', (emp_id,)).fetchall()
+        return conn.execute('SELECT * FROM leave_ledger WHERE emp_id = ? AND year = ? ORDER BY entry_id',
+                            (emp_id, year)).fetchall()
+
+@timed
+def add_adjustment(emp_id, days, note, year=None):
+    """Records a manual balance correction of days (positive or negative) for an employee."""
+    now = datetime.now()
+    with transaction() as conn:
+        if not conn.execute('SELECT 1 FROM employees WHERE emp_id = ?', (emp_id,)).fetchone():
+            return False, "Employee not found."
+        conn.execute("INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on) "
+                     "VALUES (?, ?, 'adjustment', ?, ?, ?)", (emp_id, year or now.year, days, note, now.isoformat()))
+    bump_data_version()
+    return True, f"Adjusted balance by {days:+d} days."
+
+@timed
+def run_yearly_accrual(year, allowance=MAX_LEAVE_PER_YEAR, max_carryover=MAX_CARRYOVER_DAYS):
+    """
+    Opens leave year `year` for the whole workforce in one transaction, with two set-based statements:
+    unused days above max_carryover expire (an adjustment booked to the previous year), then
+    `allowance` days accrue for the new year. Employees who already have an accrual for the year
+    (e.g. hired during it, or a re-run of this job) are skipped, so the job is idempotent.
+    Returns {'expired': employees with expired days, 'accrued': employees credited}.
+    """
+    now = datetime.now().isoformat()
+    not_yet_accrued = ('NOT EXISTS (SELECT 1 FROM leave_balances b '
+                       'WHERE b.emp_id = e.emp_id AND b.year = ? AND b.accrued > 0)')
+    with transaction() as conn:
+        expired = conn.execute(f'''
+            INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+            SELECT e.emp_id, ?, 'adjustment', ? - e.leave_balance, ?, ?
+            FROM employees e
+            WHERE e.leave_balance > ? AND {not_yet_accrued}
+        ''', (year - 1, max_carryover, f"Expired at rollover to {year}", now, max_carryover, year)).rowcount
+        accrued = conn.execute(f'''
+            INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+            SELECT e.emp_id, ?, 'accrual', ?, ?, ?
+            FROM employees e
+            WHERE {not_yet_accrued}
+        ''', (year, allowance, f"Yearly allowance {year}", now, year)).rowcount
+    if accrued or expired:
+        bump_data_version()
+    return {'expired': expired, 'accrued': accrued}
+
+@timed
+def verify_balances():
+    """
+    Recomputes every balance from the ledger and compares it with the maintained aggregates.
+    Returns a list of problems (empty when employees.leave_balance and leave_balances both match).
+    """
+    problems = []
+    with connection() as conn:
+        for row in conn.execute('''
+            SELECT e.emp_id, e.leave_balance, COALESCE(SUM(l.days), 0) AS ledger_total
+            FROM employees e LEFT JOIN leave_ledger l ON l.emp_id = e.emp_id
+            GROUP BY e.emp_id
+            HAVING e.leave_balance != ledger_total
+        '''):
+            problems.append(f"employee {row['emp_id']}: balance {row['leave_balance']}, "
+                            f"ledger total {row['ledger_total']}")
+        for row in conn.execute('''
+            WITH recomputed AS (
+                SELECT emp_id, year,
+                       SUM(CASE kind WHEN 'accrual' THEN days ELSE 0 END) AS accrued,
+                       SUM(CASE kind WHEN 'deduction' THEN -days ELSE 0 END) AS deducted,
+                       SUM(CASE kind WHEN 'adjustment' THEN days ELSE 0 END) AS adjusted
+                FROM leave_ledger GROUP BY emp_id, year
+            )
+            SELECT emp_id, year FROM (
+                SELECT * FROM recomputed
+                EXCEPT SELECT emp_id, year, accrued, deducted, adjusted FROM leave_balances)
+            UNION
+            SELECT emp_id, year FROM (
+                SELECT emp_id, year, accrued, deducted, adjusted FROM leave_balances
+                EXCEPT SELECT * FROM recomputed)
+        '''):
+            problems.append(f"employee {row['emp_id']}: yearly aggregate for {row['year']} does not match the ledger")
+    return problems
+
+# --- Script Entry Point ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the yearly leave accrual or verify balances against the ledger.")
+    parser.add_argument("--accrue", type=int, metavar="YEAR", help="open YEAR: expire unused days and accrue the allowance")
+    parser.add_argument("--verify", action="store_true", help="recompute every balance from the ledger")
+    args = parser.parse_args()
+    migrate()
+    if args.accrue:
+        counts = run_yearly_accrual(args.accrue)
+        print(f"Year {args.accrue}: expired unused days for {counts['expired']} employees, "
+              f"accrued the allowance for {counts['accrued']}.")
+    if args.verify:
+        problems = verify_balances()
+        for problem in problems[:20]:
+            print(f"INCONSISTENT: {problem}")
+        print("Balances consistent." if not problems else f"{len(problems)} inconsistencies found.")
+        sys.exit(1 if problems else 0)
+    if not (args.accrue or args.verify):
+        parser.print_help()
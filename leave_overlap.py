@@ -0,0 +1,65 @@
+from database import connection
+
+# Statuses that block a new request for the same dates
+ACTIVE_STATUSES = ('pending', 'approved')
+
+# Proposed ranges sent to SQLite per batch query (4 bound parameters each)
+BATCH_SIZE = 500
+
+# --- Overlap Detection ---
+# Dates are stored as ISO 'YYYY-MM-DD' text, so string comparison is date comparison and the
+# range test runs entirely inside idx_leave_requests_emp_status_start (emp_id, status,
+# start_date, end_date) without loading or parsing any rows in Python.
+
+def _status_filter(statuses):
+    """Returns the SQL fragment and parameters for a status IN (...) filter."""
+    return f"lr.status IN ({', '.join('?' for _ in statuses)})", list(statuses)
+
+def find_overlapping_leaves(emp_id, start_date, end_date, statuses=ACTIVE_STATUSES, conn=None):
+    """
+    Returns the employee's leave requests (in the given statuses) whose dates overlap
+    start_date..end_date (inclusive, 'YYYY-MM-DD'), oldest first.
+    Pass conn to run inside a caller's transaction.
+    """
+    status_sql, status_params = _status_filter(statuses)
+    query = f'''
+        SELECT lr.leave_id, lr.emp_id, lr.start_date, lr.end_date, lr.status
+        FROM leave_requests lr
+        WHERE lr.emp_id = ? AND {status_sql}
+          AND lr.start_date <= ? AND lr.end_date >= ?
+        ORDER BY lr.start_date
+    '''
+    params = [emp_id, *status_params, end_date, start_date]
+    if conn is not None:
+        return conn.execute(query, params).fetchall()
+    with connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+def find_overlaps_batch(proposals, statuses=ACTIVE_STATUSES):
+    """
+    Checks many proposed ranges at once, e.g. for a calendar view or a bulk import.
+    proposals is a sequence of (emp_id, start_date, end_date) tuples. Returns a dict mapping
+    the index of every proposal that conflicts to the list of overlapping leave requests;
+    proposals without conflicts are absent from the result.
+    """
+    status_sql, status_params = _status_filter(statuses)
+    conflicts = {}
+    with connection() as conn:
+        for offset in range(0, len(proposals), BATCH_SIZE):
+            chunk = proposals[offset:offset + BATCH_SIZE]
+            values = ', '.join('(?, ?, ?, ?)' for _ in chunk)
+            params = []
+            for i, (emp_id, start_date, end_date) in enumerate(chunk, start=offset):
+                params.extend((i, emp_id, start_date, end_date))
+            rows = conn.execute(f'''
+                WITH proposed(idx, emp_id, start_date, end_date) AS (VALUES {values})
+                SELECT p.idx, lr.leave_id, lr.emp_id, lr.start_date, lr.end_date, lr.status
+                FROM proposed p
+                JOIN leave_requests lr
+                  ON lr.emp_id = p.emp_id AND {status_sql}
+                 AND lr.start_date <= p.end_date AND lr.end_date >= p.start_date
+                ORDER BY p.idx, lr.start_date
+            ''', params + status_params).fetchall()
+            for row in rows:
+                conflicts.setdefault(row['idx'], []).append(row)
+    return conflicts
@@ -0,0 +1,314 @@
+import sqlite3
+import threading
+from datetime import datetime
+import random
+
+from absence import record_absences
+from database import connection, transaction
+from instrumentation import timed
+from leave_overlap import find_overlapping_leaves
+from migrations import migrate
+from query_cache import bump_data_version, cached_query
+
+# Application-wide constants
+MAX_LEAVE_PER_YEAR = 24
+MAX_CONSECUTIVE_DAYS = 10
+
+# --- Database Helper Functions ---
+
+@timed
+def initialize_data():
+    """Wipes existing data and populates the database with new, random employees and a manager."""
+    # Imported here because generate_data itself imports this module's constants
+    from generate_data import generate
+    generate(num_employees=8, num_requests=0, seed=random.randrange(2**32), manager_ratio=1 / 8)
+
+@timed
+def is_data_initialized():
+    """Checks if the database is populated with initial data by counting employee records."""
+    with connection() as conn:
+        count = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
+    return count > 0
+
+# Set once this process has bootstrapped the database (see bootstrap)
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+@timed
+def bootstrap():
+    """
+    One-time, process-wide start-up: creates or upgrades the schema and seeds the demo employees if
+    there are none yet. That covers a missing database file, an existing but empty one, and one whose
+    tables exist but hold no employees. Streamlit reruns the script on every interaction but keeps
+    imported modules, so later calls only check a flag instead of querying the database.
+    """
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        migrate()
+        if not is_data_initialized():
+            initialize_data()
+        _bootstrapped = True
+
+@timed
+@cached_query
+def get_employees(role=None):
+    """Fetches a list of all employees, optionally filtered by their role."""
+    with connection() as conn:
+        c = conn.cursor()
+        if role:
+            c.execute('SELECT * FROM employees WHERE role=? ORDER BY name', (role,))
+        else:
+            c.execute('SELECT * FROM employees ORDER BY name')
+        return c.fetchall()
+
+def _leave_request_filters(emp_id=None, status=None, date_from=None, date_to=None):
+    """Builds the WHERE conditions and parameters shared by the leave request queries."""
+    params, conditions = [], []
+    if emp_id is not None:
+        conditions.append("lr.emp_id = ?")
+        params.append(emp_id)
+    if status is not None:
+        conditions.append("lr.status = ?")
+        params.append(status)
+    # Date range filter: requests whose dates overlap date_from..date_to ('YYYY-MM-DD', inclusive)
+    if date_from is not None:
+        conditions.append("lr.end_date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("lr.start_date <= ?")
+        params.append(date_to)
+    return conditions, params
+
+@timed
+@cached_query
+def get_leave_requests(emp_id=None, status=None, date_from=None, date_to=None, after=None, limit=None):
+    """
+    Fetches leave requests, newest first, optionally filtered by employee ID, status and date range.
+    For keyset pagination pass limit, and after=(applied_on, leave_id) of the last row of the previous
+    page; the next page is then an index range seek rather than an OFFSET scan.
+    """
+    conditions, params = _leave_request_filters(emp_id, status, date_from, date_to)
+    if after is not None:
+        conditions.append("(lr.applied_on, lr.leave_id) < (?, ?)")
+        params.extend(after)
+    query = "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY lr.applied_on DESC, lr.leave_id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    with connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+@timed
+def get_leave_requests_page(page_size, after=None, **filters):
+    """
+    Fetches one page of leave requests (see get_leave_requests for the filters).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = get_leave_requests(after=after, limit=page_size + 1, **filters)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, (rows[-1]['applied_on'], rows[-1]['leave_id'])
+
+@timed
+@cached_query
+def count_leave_requests(emp_id=None, status=None, date_from=None, date_to=None):
+    """Counts the leave requests matching the same filters as get_leave_requests."""
+    conditions, params = _leave_request_filters(emp_id, status, date_from, date_to)
+    query = "SELECT COUNT(*) FROM leave_requests lr"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    with connection() as conn:
+        return conn.execute(query, params).fetchone()[0]
+
+@timed
+def get_leave_request_ids(emp_id=None, status=None, date_from=None, date_to=None):
+    """Returns just the IDs of the matching leave requests, e.g. to act on every filtered request at once."""
+    conditions, params = _leave_request_filters(emp_id, status, date_from, date_to)
+    query = "SELECT lr.leave_id FROM leave_requests lr"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY lr.applied_on DESC, lr.leave_id DESC"
+    with connection() as conn:
+        return [row[0] for row in conn.execute(query, params)]
+
+@timed
+@cached_query
+def get_employee(emp_id):
+    """Fetches a single employee record using their ID."""
+    with connection() as conn:
+        return conn.execute('SELECT * FROM employees WHERE emp_id=?', (emp_id,)).fetchone()
+
+@timed
+def add_employee(name, role, leave_balance):
+    """Adds a new employee record to the database, with leave_balance days accrued for the current year."""
+    try:
+        name = name.strip()
+        role = role.strip().lower()
+        now = datetime.now()
+        with transaction() as conn:
+            emp_id = conn.execute('INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, 0)',
+                                  (name, role)).lastrowid
+            # The ledger trigger sets employees.leave_balance from this entry
+            conn.execute("INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on) "
+                         "VALUES (?, ?, 'accrual', ?, 'Starting balance', ?)",
+                         (emp_id, now.year, leave_balance, now.isoformat()))
+        bump_data_version()
+        return True, f"Successfully added new {role}: {name}."
+    except sqlite3.Error as e:
+        return False, f"Database error: {e}"
+
+@timed
+def apply_leave(emp_id, start_date, end_date, reason):
+    """Submits a new leave request for an employee to the database."""
+    try:
+        s_date = datetime.strptime(start_date, "%Y-%m-%d")
+        e_date = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        return False, "Invalid date format. Use YYYY-MM-DD."
+    if e_date < s_date:
+        return False, "End date cannot be before start date."
+    if s_date < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+        return False, "Start date cannot be in the past."
+    total_days = (e_date - s_date).days + 1
+    if total_days > MAX_CONSECUTIVE_DAYS:
+        return False, f"Cannot apply for more than {MAX_CONSECUTIVE_DAYS} consecutive days."
+    emp = get_employee(emp_id)
+    if not emp:
+        return False, "Employee not found."
+    if total_days > emp['leave_balance']:
+        return False, "Insufficient leave balance."
+    with transaction() as conn:
+        # Single indexed range query against the employee's pending and approved requests,
+        # checked under the write lock so two submissions cannot both pass it
+        if find_overlapping_leaves(emp_id, start_date, end_date, conn=conn):
+            return False, "Leave dates overlap with an existing pending or approved leave."
+        conn.execute('''
+            INSERT INTO leave_requests (emp_id, start_date, end_date, leave_reason, status, applied_on)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (emp_id, start_date, end_date, reason, 'pending', datetime.now().isoformat()))
+    bump_data_version()
+    return True, "Leave application submitted successfully."
+
+# Maximum number of ids bound into a single IN (...) list
+SQL_CHUNK_SIZE = 900
+
+def _chunks(items, size=SQL_CHUNK_SIZE):
+    """Yields successive slices of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _process_leaves(conn, manager_id, leave_ids, new_status):
+    """
+    Approves or rejects a batch of pending leave requests on a connection that is already inside
+    a write transaction. The requests, pending counts and balances are read with one query per
+    chunk, each id is then decided in order exactly as approve_leave/reject_leave would decide it
+    one at a time, and the writes go out with executemany (approved days as ledger deductions
+    and daily absence rows).
+    Every write is conditional (status still 'pending', and the ledger refuses overdrafts), so a
+    request can never be processed twice or overdraw a balance. Returns {leave_id: (success, message)}.
+    """
+    manager = conn.execute('SELECT role FROM employees WHERE emp_id=?', (manager_id,)).fetchone()
+    if not manager or manager['role'] != 'manager':
+        return {leave_id: (False, "Not authorized.") for leave_id in leave_ids}
+
+    unique_ids = list(dict.fromkeys(leave_ids))
+    leaves = {}
+    for chunk in _chunks(unique_ids):
+        placeholders = ', '.join('?' for _ in chunk)
+        for row in conn.execute(f'SELECT leave_id, emp_id, start_date, end_date, status FROM leave_requests '
+                                f'WHERE leave_id IN ({placeholders})', chunk):
+            leaves[row['leave_id']] = row
+
+    pending_counts, balances = {}, {}
+    if new_status == 'approved':
+        emp_ids = list({leave['emp_id'] for leave in leaves.values()})
+        for chunk in _chunks(emp_ids):
+            placeholders = ', '.join('?' for _ in chunk)
+            pending_counts.update(conn.execute(
+                f"SELECT emp_id, COUNT(*) FROM leave_requests WHERE status='pending' AND emp_id IN ({placeholders}) "
+                f"GROUP BY emp_id", chunk).fetchall())
+            balances.update(conn.execute(
+                f'SELECT emp_id, leave_balance FROM employees WHERE emp_id IN ({placeholders})', chunk).fetchall())
+
+    results, processed, deductions, absences = {}, set(), [], []
+    for leave_id in unique_ids:
+        leave = leaves.get(leave_id)
+        if not leave:
+            results[leave_id] = (False, "Leave request not found.")
+            continue
+        if leave['status'] != 'pending':
+            results[leave_id] = (False, "Leave request already processed.")
+            continue
+        if new_status == 'approved':
+            emp_id = leave['emp_id']
+            if pending_counts[emp_id] > 1:
+                results[leave_id] = (False, "This employee has multiple pending leave requests. "
+                                            "Only one can be approved at a time.")
+                continue
+            start_date = datetime.strptime(leave['start_date'], "%Y-%m-%d")
+            end_date = datetime.strptime(leave['end_date'], "%Y-%m-%d")
+            days = (end_date - start_date).days + 1
+            if balances[emp_id] < days:
+                results[leave_id] = (False, "Employee has insufficient leave balance.")
+                continue
+            balances[emp_id] -= days
+            pending_counts[emp_id] -= 1
+            deductions.append((emp_id, start_date.year, -days, leave_id))
+            absences.append((leave_id, emp_id, leave['start_date'], leave['end_date']))
+        processed.add(leave_id)
+        results[leave_id] = (True, "Leave approved." if new_status == 'approved' else "Leave rejected")
+
+    now = datetime.now().isoformat()
+    if deductions:
+        # The ledger triggers update employees.leave_balance and the yearly aggregate, and abort the
+        # whole batch with an IntegrityError if a deduction would overdraw (unreachable under the write lock)
+        conn.executemany("INSERT INTO leave_ledger (emp_id, year, kind, days, leave_id, note, created_on) "
+                         "VALUES (?, ?, 'deduction', ?, ?, 'Approved leave', ?)",
+                         [(*deduction, now) for deduction in deductions])
+    if processed:
+        c = conn.executemany("UPDATE leave_requests SET status=?, processed_on=? WHERE leave_id=? AND status='pending'",
+                             [(new_status, now, leave_id) for leave_id in processed])
+        if c.rowcount != len(processed):
+            raise sqlite3.IntegrityError("Leave requests changed during processing.")
+    # Approved days go into the daily absence index in the same transaction
+    record_absences(conn, absences)
+    return results
+
+def _bump_if_processed(results):
+    """Invalidates cached reads once a batch that changed at least one request has committed."""
+    if any(success for success, _ in results.values()):
+        bump_data_version()
+
+@timed
+def approve_leave(manager_id, leave_id):
+    """Approves a pending leave request, deducting the days from the employee's balance."""
+    return approve_leaves(manager_id, [leave_id])[leave_id]
+
+@timed
+def reject_leave(manager_id, leave_id):
+    """Rejects a pending leave request without affecting the employee's leave balance."""
+    return reject_leaves(manager_id, [leave_id])[leave_id]
+
+@timed
+def approve_leaves(manager_id, leave_ids):
+    """Approves a batch of pending leave requests in one transaction. Returns {leave_id: (success, message)}."""
+    with transaction() as conn:
+        results = _process_leaves(conn, manager_id, list(leave_ids), 'approved')
+    _bump_if_processed(results)
+    return results
+
+@timed
+def reject_leaves(manager_id, leave_ids):
+    """Rejects a batch of pending leave requests in one transaction. Returns {leave_id: (success, message)}."""
+    with transaction() as conn:
+        results = _process_leaves(conn, manager_id, list(leave_ids), 'rejected')
+    _bump_if_processed(results)
+    return results
@@ -1,233 +1,132 @@
-import streamlit as st
-import sqlite3
-from datetime import datetime
-from faker import Faker
-import random
 import os
+from datetime import date, timedelta
 
-# Application-wide constants
-MAX_LEAVE_PER_YEAR = 24
-MAX_CONSECUTIVE_DAYS = 10
-DB_NAME = "leave_management.db"
-
-fake = Faker()
-
-# --- Database Helper Functions ---
+import streamlit as st
+from collections import Counter
 
-def get_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+import instrumentation
+from query_cache import cache_stats
+from absence import count_absences, team_calendar
+from leave_ledger import get_ledger, get_yearly_balance
+from export_jobs import (EXPORT_FORMATS, start_export_job, get_export_jobs, poll_export_jobs, has_active_export_jobs,
+                         export_job_file)
+from leave_service import (
+    MAX_LEAVE_PER_YEAR, bootstrap,
+    get_employees, get_employee, get_leave_requests_page, count_leave_requests,
+    get_leave_request_ids, add_employee, apply_leave, approve_leave, reject_leave, approve_leaves, reject_leaves,
+)
 
-def create_tables():
-    """Creates the necessary database tables for employees and leave requests if they don't exist."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            role TEXT CHECK(role IN ('employee', 'manager')) NOT NULL,
-            leave_balance INTEGER NOT NULL
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS leave_requests (
-            leave_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            emp_id INTEGER NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            leave_reason TEXT,
-            status TEXT CHECK(status IN ('pending', 'approved', 'rejected')) NOT NULL DEFAULT 'pending',
-            applied_on TEXT NOT NULL,
-            processed_on TEXT,
-            FOREIGN KEY(emp_id) REFERENCES employees(emp_id)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+# Number of leave requests fetched and drawn per page in the portals
+PAGE_SIZE = 20
 
-def initialize_data():
-    """Wipes existing data and populates the database with new, random employees and a manager."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('DELETE FROM leave_requests')
-    c.execute('DELETE FROM employees')
-    conn.commit()
-    c.execute('INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, ?)',
-              (fake.name(), 'manager', MAX_LEAVE_PER_YEAR))
-    for _ in range(7):
-        c.execute('INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, ?)',
-                  (fake.name(), 'employee', random.randint(20, 23)))
-    conn.commit()
-    conn.close()
+# Days shown by default in the Manager Portal's team calendar, and the longest range drawn as a grid
+CALENDAR_DAYS = 28
+CALENDAR_MAX_GRID_DAYS = 92
+# Employees per page of the team calendar grid
+CALENDAR_PAGE_SIZE = 50
 
-def is_data_initialized():
-    """Checks if the database is populated with initial data by counting employee records."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM employees')
-    count = c.fetchone()[0]
-    conn.close()
-    return count > 0
+# Seconds between refreshes of the export job list while an export is queued or running
+EXPORT_POLL_SECONDS = 2
 
-def get_employees(role=None):
-    """Fetches a list of all employees, optionally filtered by their role."""
-    conn = get_connection()
-    c = conn.cursor()
-    if role:
-        c.execute('SELECT * FROM employees WHERE role=? ORDER BY name', (role,))
-    else:
-        c.execute('SELECT * FROM employees ORDER BY name')
-    rows = c.fetchall()
-    conn.close()
-    return rows
+# --- Pagination Helpers ---
 
-def get_leave_requests(emp_id=None, status=None):
-    """Fetches leave requests, optionally filtered by employee ID or status."""
-    conn = get_connection()
-    c = conn.cursor()
-    query = "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id"
-    params, conditions = [], []
-    if emp_id is not None:
-        conditions.append("lr.emp_id = ?")
-        params.append(emp_id)
-    if status is not None:
-        conditions.append("lr.status = ?")
-        params.append(status)
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY applied_on DESC"
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+def current_page_cursor(state_key):
+    """Returns the keyset cursor of the page being viewed (None for the first page)."""
+    return st.session_state.setdefault(state_key, [None])[-1]
 
-def get_employee(emp_id):
-    """Fetches a single employee record using their ID."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM employees WHERE emp_id=?', (emp_id,))
-    emp = c.fetchone()
-    conn.close()
-    return emp
+def page_controls(state_key, next_cursor):
+    """
+    Draws Previous/Next controls for a keyset-paginated list. The cursors of visited pages are kept in
+    session state under state_key (which should include the active filters, so changing a filter starts
+    again at page one) and each click reruns the script on the new page.
+    """
+    cursors = st.session_state.setdefault(state_key, [None])
+    cols = st.columns([1, 2, 1])
+    with cols[0]:
+        if st.button("Previous", key=f"{state_key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with cols[1]:
+        st.caption(f"Page {len(cursors)}")
+    with cols[2]:
+        if st.button("Next", key=f"{state_key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
-def add_employee(name, role, leave_balance):
-    """Adds a new employee record to the database."""
-    try:
-        name = name.strip()
-        role = role.strip().lower()
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute('INSERT INTO employees (name, role, leave_balance) VALUES (?, ?, ?)',
-                  (name, role, leave_balance))
-        conn.commit()
-        conn.close()
-        return True, f"Successfully added new {role}: {name}."
-    except sqlite3.Error as e:
-        return False, f"Database error: {e}"
+# --- Export Jobs ---
 
-def apply_leave(emp_id, start_date, end_date, reason):
-    """Submits a new leave request for an employee to the database."""
-    try:
-        s_date = datetime.strptime(start_date, "%Y-%m-%d")
-        e_date = datetime.strptime(end_date, "%Y-%m-%d")
-    except ValueError:
-        return False, "Invalid date format. Use YYYY-MM-DD."
-    if e_date < s_date:
-        return False, "End date cannot be before start date."
-    if s_date < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
-        return False, "Start date cannot be in the past."
-    total_days = (e_date - s_date).days + 1
-    if total_days > MAX_CONSECUTIVE_DAYS:
-        return False, f"Cannot apply for more than {MAX_CONSECUTIVE_DAYS} consecutive days."
-    emp = get_employee(emp_id)
-    if not emp:
-        return False, "Employee not found."
-    if total_days > emp['leave_balance']:
-        return False, "Insufficient leave balance."
-    approved_leaves = get_leave_requests(emp_id, status='approved')
-    for leave in approved_leaves:
-        lr_start = datetime.strptime(leave['start_date'], "%Y-%m-%d")
-        lr_end = datetime.strptime(leave['end_date'], "%Y-%m-%d")
-        if not (e_date < lr_start or s_date > lr_end):
-            return False, "Leave dates overlap with existing approved leave."
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO leave_requests (emp_id, start_date, end_date, leave_reason, status, applied_on)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (emp_id, start_date, end_date, reason, 'pending', datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
-    return True, "Leave application submitted successfully."
+def export_jobs_panel():
+    """
+    Lists the recent export jobs with their progress. Runs as a fragment, so while an export is active
+    only this panel refreshes every EXPORT_POLL_SECONDS instead of the whole script. Only then is the
+    job list read from the database on each refresh; otherwise it comes from the query cache.
+    """
+    jobs = poll_export_jobs() if has_active_export_jobs() else get_export_jobs()
+    if not jobs:
+        st.caption("No exports yet.")
+        return
+    for job in jobs:
+        summary = (f"Export #{job['job_id']} | {job['format'].upper()} | {job['status'].capitalize()} | "
+                   f"Requested: {job['created_on'][:19].replace('T', ' ')}")
+        if job['status'] in ('queued', 'running'):
+            total = job['rows_total'] or 0
+            fraction = min(job['rows_done'] / total, 1.0) if total else 0.0
+            st.progress(fraction, text=f"{summary} | {job['rows_done']} of {total or '?'} rows")
+        elif job['status'] == 'failed':
+            st.write(f"{summary} | {job['error']}")
+        else:
+            st.write(f"{summary} | {job['rows_done']} rows")
+    # Only the chosen file is read into the download button, not every finished export on each refresh
+    finished = [job for job in jobs if export_job_file(job)]
+    if finished:
+        chosen = st.selectbox("Download export", [None] + finished,
+                              format_func=lambda job: "Choose a finished export" if job is None
+                              else f"#{job['job_id']} ({job['format'].upper()})")
+        if chosen is not None:
+            path = export_job_file(chosen)
+            with open(path, "rb") as f:
+                st.download_button("Download", f.read(), file_name=os.path.basename(path))
 
-def approve_leave(manager_id, leave_id):
-    """Approves a pending leave request, deducting the days from the employee's balance."""
-    manager = get_employee(manager_id)
-    if not manager or manager['role'] != 'manager':
-        return False, "Not authorized."
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM leave_requests WHERE leave_id=?', (leave_id,))
-    leave = c.fetchone()
-    if not leave:
-        conn.close()
-        return False, "Leave request not found."
-    if leave['status'] != 'pending':
-        conn.close()
-        return False, "Leave request already processed."
-    emp_id = leave['emp_id']
-    pending_requests = get_leave_requests(emp_id=emp_id, status='pending')
-    if len(pending_requests) > 1:
-        conn.close()
-        return False, "This employee has multiple pending leave requests. Only one can be approved at a time."
-    start_date = datetime.strptime(leave['start_date'], "%Y-%m-%d")
-    end_date = datetime.strptime(leave['end_date'], "%Y-%m-%d")
-    days = (end_date - start_date).days + 1
-    emp = get_employee(emp_id)
-    if emp['leave_balance'] < days:
-        conn.close()
-        return False, "Employee has insufficient leave balance."
-    new_balance = emp['leave_balance'] - days
-    c.execute('UPDATE employees SET leave_balance=? WHERE emp_id=?', (new_balance, emp_id))
-    c.execute('UPDATE leave_requests SET status=?, processed_on=? WHERE leave_id=?',
-              ('approved', datetime.now().isoformat(), leave_id))
-    conn.commit()
-    conn.close()
-    return True, "Leave approved."
+# --- Performance Panel ---
 
-def reject_leave(manager_id, leave_id):
-    """Rejects a pending leave request without affecting the employee's leave balance."""
-    manager = get_employee(manager_id)
-    if not manager or manager['role'] != 'manager':
-        return False, "Not authorized."
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM leave_requests WHERE leave_id=?', (leave_id,))
-    leave = c.fetchone()
-    if not leave:
-        conn.close()
-        return False, "Leave request not found."
-    if leave['status'] != 'pending':
-        conn.close()
-        return False, "Leave request already processed."
-    c.execute('UPDATE leave_requests SET status=?, processed_on=? WHERE leave_id=?',
-              ('rejected', datetime.now().isoformat(), leave_id))
-    conn.commit()
-    conn.close()
-    return True, "Leave rejected"
+def performance_panel():
+    """
+    Finishes the trace of this rerun and shows it in the sidebar: every SQL statement with its duration
+    and row count, the timed helper calls, and downloads of the process-wide totals as JSON or
+    Prometheus text.
+    """
+    stats = cache_stats()
+    trace = instrumentation.stop_trace()
+    queries, calls = trace['queries'], trace['calls']
+    with st.sidebar.expander("Performance", expanded=True):
+        st.write(f"Rerun: **{trace['seconds'] * 1000:.1f} ms**")
+        st.write(f"SQL statements: **{len(queries)}** "
+                 f"({sum(q['seconds'] for q in queries) * 1000:.1f} ms, {sum(q['rows'] for q in queries)} rows)")
+        st.write(f"Cache: {stats['hits']} hits, {stats['misses']} misses since start-up")
+        if queries:
+            st.dataframe([{'statement': q['sql'], 'ms': round(q['seconds'] * 1000, 3), 'rows': q['rows']}
+                          for q in queries], hide_index=True)
+        if calls:
+            st.dataframe([{'function': c['function'], 'ms': round(c['seconds'] * 1000, 3), 'queries': c['queries']}
+                          for c in calls], hide_index=True)
+        st.download_button("Download JSON", instrumentation.metrics_json(trace),
+                           file_name="leave_tracker_metrics.json", mime="application/json")
+        st.download_button("Download Prometheus metrics", instrumentation.metrics_prometheus(),
+                           file_name="leave_tracker_metrics.prom", mime="text/plain")
 
 # --- Main Application Logic ---
 
-# Create database and tables if they do not exist
-if not os.path.exists(DB_NAME):
-    create_tables()
+# Tracing is decided before anything touches the database so the whole rerun is captured. Turning it
+# off also closes a trace left open by a rerun that was cut short by st.rerun().
+show_performance = st.sidebar.toggle("Performance", key="show_performance",
+                                     help="Trace the SQL statements and helper calls of each rerun.")
+if show_performance:
+    instrumentation.start_trace()
+else:
+    instrumentation.stop_trace()
 
-# Initialize dummy data on the first run of the app
-if not is_data_initialized():
-    initialize_data()
+# Create or upgrade the database and seed the demo data, once per process (later reruns skip it)
+bootstrap()
 
 # --- Streamlit UI Setup ---
 
@@ -252,6 +151,12 @@ if user_role == "Employee":
         emp = get_employee(employee_id)
         st.write(f"Welcome, {emp['name']}!")
         st.write(f"Your current leave balance: **{emp['leave_balance']} days**")
+        with st.expander("Balance history"):
+            accrued, deducted, adjusted = get_yearly_balance(employee_id)
+            st.write(f"This year: {accrued} days accrued, {deducted} taken, {adjusted:+d} adjusted")
+            st.dataframe([{'date': entry['created_on'][:10], 'year': entry['year'], 'kind': entry['kind'],
+                           'days': entry['days'], 'leave ID': entry['leave_id'], 'note': entry['note']}
+                          for entry in get_ledger(employee_id)], hide_index=True)
 
         st.subheader("Apply for Leave")
         start_date = st.date_input("Start date")
@@ -267,13 +172,16 @@ if user_role == "Employee":
                 st.error(msg)
         
         st.subheader("Your Leave Requests")
-        leave_requests = get_leave_requests(emp_id=employee_id)
+        history_key = f"history_pages_{employee_id}"
+        leave_requests, next_cursor = get_leave_requests_page(
+            PAGE_SIZE, after=current_page_cursor(history_key), emp_id=employee_id)
         if leave_requests:
             for lr in leave_requests:
                 st.write(
                     f"ID: {lr['leave_id']} | Status: {lr['status'].capitalize()} | "
                     f"From: {lr['start_date']} To: {lr['end_date']} | Reason: {lr['leave_reason'] or 'No reason provided'}"
                 )
+            page_controls(history_key, next_cursor)
         else:
             st.info("No leave requests found.")
 
@@ -292,9 +200,66 @@ elif user_role == "Manager":
         st.write(f"Welcome, Manager {get_employee(manager_id)['name']}!")
 
         st.subheader("Pending Leave Requests")
-        pending_leaves = get_leave_requests(status='pending')
-        st.write(f"Pending requests found: {len(pending_leaves)}")
+        # Messages do not survive st.rerun(), so the outcome of the last bulk action is kept in session state
+        if "bulk_action_result" in st.session_state:
+            st.success(st.session_state.pop("bulk_action_result"))
+        # Filters are applied in SQL; only the page being viewed is fetched and drawn
+        filter_cols = st.columns(2)
+        with filter_cols[0]:
+            filter_emp = st.selectbox(
+                "Employee",
+                [None] + [(e['emp_id'], e['name']) for e in get_employees()],
+                format_func=lambda x: "All employees" if x is None else x[1]
+            )
+        with filter_cols[1]:
+            date_range = st.date_input("Leave dates between", value=[])
+        filters = {
+            'status': 'pending',
+            'emp_id': filter_emp[0] if filter_emp else None,
+            'date_from': date_range[0].strftime("%Y-%m-%d") if len(date_range) == 2 else None,
+            'date_to': date_range[1].strftime("%Y-%m-%d") if len(date_range) == 2 else None,
+        }
+        pending_key = "pending_pages_{emp_id}_{date_from}_{date_to}".format(**filters)
+        pending_count = count_leave_requests(**filters)
+        pending_leaves, next_cursor = get_leave_requests_page(
+            PAGE_SIZE, after=current_page_cursor(pending_key), **filters)
+        st.write(f"Pending requests found: {pending_count}")
         if pending_leaves:
+            # Process many requests in one transaction and one rerun instead of one click per request
+            with st.expander("Bulk actions"):
+                labels = {
+                    lr['leave_id']: f"#{lr['leave_id']} {lr['name']} ({lr['start_date']} to {lr['end_date']})"
+                    for lr in pending_leaves
+                }
+                select_all = st.checkbox(f"Select all filtered ({pending_count})")
+                if not select_all:
+                    selected_ids = st.multiselect("Requests on this page", list(labels), format_func=labels.get)
+                cols = st.columns(2)
+                bulk_action = None
+                with cols[0]:
+                    if st.button("Approve selected", disabled=not (select_all or selected_ids)):
+                        bulk_action = "Approved", approve_leaves
+                with cols[1]:
+                    if st.button("Reject selected", disabled=not (select_all or selected_ids)):
+                        bulk_action = "Rejected", reject_leaves
+                if bulk_action:
+                    verb, action = bulk_action
+                    if select_all:
+                        # Only the IDs are fetched, and only when the action actually runs
+                        selected_ids = get_leave_request_ids(**filters)
+                    results = action(manager_id, selected_ids)
+                    done = sum(1 for success, _ in results.values() if success)
+                    failures = Counter(msg for success, msg in results.values() if not success)
+                    summary = f"{verb} {done} of {len(results)} requests."
+                    for msg, count in failures.items():
+                        summary += f" {count} skipped: {msg}"
+                    if done:
+                        st.session_state["bulk_action_result"] = summary
+                        st.session_state.pop(pending_key, None)
+                        st.rerun()
+                    else:
+                        st.error(summary)
+
             for lr in pending_leaves:
                 with st.container(border=True):
                     st.write(
@@ -323,9 +288,45 @@ elif user_role == "Manager":
                                 st.rerun() 
                             else:
                                 st.error(msg)
+            page_controls(pending_key, next_cursor)
         else:
             st.info("No pending leave requests.")
     
+        # Who is out when, read from the daily absence index instead of expanding leave date ranges
+        st.subheader("Team Calendar")
+        today = date.today()
+        calendar_range = st.date_input("Show absences between", value=[today, today + timedelta(days=CALENDAR_DAYS - 1)],
+                                       key="calendar_range")
+        if len(calendar_range) == 2:
+            cal_from, cal_to = (d.strftime("%Y-%m-%d") for d in calendar_range)
+            st.bar_chart({"Employees out": dict(count_absences(cal_from, cal_to))})
+            if (calendar_range[1] - calendar_range[0]).days >= CALENDAR_MAX_GRID_DAYS:
+                st.caption(f"Pick at most {CALENDAR_MAX_GRID_DAYS} days to see who is out on each day.")
+            else:
+                calendar_key = f"calendar_pages_{cal_from}_{cal_to}"
+                calendar_cursor = current_page_cursor(calendar_key)
+                calendar, next_cursor = team_calendar(cal_from, cal_to, CALENDAR_PAGE_SIZE, after=calendar_cursor)
+                if calendar.empty and calendar_cursor is None:
+                    st.info("Nobody is on approved leave in this period.")
+                else:
+                    st.dataframe(calendar)
+                    page_controls(calendar_key, next_cursor)
+
+        # Exports run on a background pool; the script only queues the job and polls its progress
+        st.subheader("Export Leave History")
+        export_cols = st.columns([2, 1])
+        with export_cols[0]:
+            export_format = st.selectbox("Format", EXPORT_FORMATS, format_func=str.upper,
+                                         help="Parquet and Feather need the optional pyarrow package.")
+        with export_cols[1]:
+            if st.button("Start export"):
+                success, msg = start_export_job(manager_id, export_format)
+                if success:
+                    st.success(msg)
+                else:
+                    st.error(msg)
+        st.fragment(export_jobs_panel, run_every=EXPORT_POLL_SECONDS if has_active_export_jobs() else None)()
+
     # Form to add a new employee to the database
     st.subheader("Add New Employee")
     with st.form("add_employee_form"):
@@ -342,4 +343,7 @@ elif user_role == "Manager":
                 else:
                     st.error(msg)
             else:
-                st.error("Employee name cannot be empty.")
\ No newline at end of file
+                st.error("Employee name cannot be empty.")
+
+if show_performance:
+    performance_panel()
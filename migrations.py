@@ -0,0 +1,338 @@
+import sys
+
+from database import connection
+from instrumentation import timed
+
+# --- Schema Migrations ---
+# Each entry upgrades the schema by one version. The version a database is at is stored in
+# SQLite's header (PRAGMA user_version), so existing files are upgraded in place and migrations
+# that already ran are skipped. Never edit a released migration; append a new one instead.
+
+MIGRATIONS = [
+    # 1: Base tables (what create_tables() used to create).
+    (1, [
+        '''
+        CREATE TABLE IF NOT EXISTS employees (
+            emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT CHECK(role IN ('employee', 'manager')) NOT NULL,
+            leave_balance INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            leave_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            leave_reason TEXT,
+            status TEXT CHECK(status IN ('pending', 'approved', 'rejected')) NOT NULL DEFAULT 'pending',
+            applied_on TEXT NOT NULL,
+            processed_on TEXT,
+            FOREIGN KEY(emp_id) REFERENCES employees(emp_id)
+        )
+        ''',
+    ]),
+    # 2: Indexes for the hot portal queries.
+    (2, [
+        # Per-employee history / overlap checks: WHERE emp_id=? AND status=? (range on start_date)
+        'CREATE INDEX IF NOT EXISTS idx_leave_requests_emp_status_start '
+        'ON leave_requests (emp_id, status, start_date, end_date)',
+        # Manager pending queue: WHERE status='pending' ORDER BY applied_on DESC
+        'CREATE INDEX IF NOT EXISTS idx_leave_requests_status_applied '
+        'ON leave_requests (status, applied_on)',
+        # Portal name pickers: WHERE role=? ORDER BY name
+        'CREATE INDEX IF NOT EXISTS idx_employees_role_name ON employees (role, name)',
+        # Collect planner statistics so per-employee filters prefer the (emp_id, status) index
+        'PRAGMA analysis_limit = 1000',
+        'ANALYZE',
+    ]),
+    # 3: Incremental exports look up requests processed since the last export's watermark.
+    (3, [
+        'CREATE INDEX IF NOT EXISTS idx_leave_requests_processed_on ON leave_requests (processed_on)',
+    ]),
+    # 4: Keyset pagination of an employee's history: WHERE emp_id=? ORDER BY applied_on DESC, leave_id DESC
+    (4, [
+        'CREATE INDEX IF NOT EXISTS idx_leave_requests_emp_applied ON leave_requests (emp_id, applied_on)',
+    ]),
+    # 5: Background export jobs started from the Manager Portal (see export_jobs.py).
+    (5, [
+        '''
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            requested_by INTEGER,
+            format TEXT CHECK(format IN ('csv', 'parquet', 'feather')) NOT NULL,
+            status TEXT CHECK(status IN ('queued', 'running', 'done', 'failed')) NOT NULL DEFAULT 'queued',
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            rows_total INTEGER,
+            output_path TEXT,
+            error TEXT,
+            created_on TEXT NOT NULL,
+            started_on TEXT,
+            finished_on TEXT,
+            updated_on TEXT NOT NULL,
+            FOREIGN KEY(requested_by) REFERENCES employees(emp_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs (status)',
+    ]),
+    # 6: Leave ledger (see leave_ledger.py). employees.leave_balance becomes the running total of an
+    # employee's ledger entries and leave_balances their per-year aggregate; both are maintained by
+    # triggers on every ledger insert, so balance reads stay single-row lookups.
+    (6, [
+        '''
+        CREATE TABLE IF NOT EXISTS leave_ledger (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            kind TEXT CHECK(kind IN ('accrual', 'deduction', 'adjustment')) NOT NULL,
+            days INTEGER NOT NULL CHECK((kind = 'accrual' AND days >= 0) OR (kind = 'deduction' AND days <= 0)
+                                        OR kind = 'adjustment'),
+            leave_id INTEGER,
+            note TEXT,
+            created_on TEXT NOT NULL,
+            FOREIGN KEY(emp_id) REFERENCES employees(emp_id),
+            FOREIGN KEY(leave_id) REFERENCES leave_requests(leave_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_leave_ledger_emp_year ON leave_ledger (emp_id, year)',
+        '''
+        CREATE TABLE IF NOT EXISTS leave_balances (
+            emp_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            accrued INTEGER NOT NULL DEFAULT 0,
+            deducted INTEGER NOT NULL DEFAULT 0,
+            adjusted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (emp_id, year)
+        ) WITHOUT ROWID
+        ''',
+        # Existing balances become opening adjustments for the current year (before the triggers exist,
+        # so they are not added to employees.leave_balance a second time)
+        '''
+        INSERT INTO leave_ledger (emp_id, year, kind, days, note, created_on)
+        SELECT emp_id, CAST(strftime('%Y', 'now', 'localtime') AS INTEGER), 'adjustment', leave_balance,
+               'Opening balance', strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+        FROM employees
+        ''',
+        '''
+        INSERT INTO leave_balances (emp_id, year, adjusted)
+        SELECT emp_id, year, SUM(days) FROM leave_ledger GROUP BY emp_id, year
+        ''',
+        # Deductions may never overdraw a balance (checked again here, under the write lock)
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_leave_ledger_no_overdraw
+        BEFORE INSERT ON leave_ledger
+        WHEN NEW.kind = 'deduction'
+         AND (SELECT leave_balance FROM employees WHERE emp_id = NEW.emp_id) + NEW.days < 0
+        BEGIN
+            SELECT RAISE(ABORT, 'Insufficient leave balance.');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_leave_ledger_aggregate
+        AFTER INSERT ON leave_ledger
+        BEGIN
+            UPDATE employees SET leave_balance = leave_balance + NEW.days WHERE emp_id = NEW.emp_id;
+            INSERT INTO leave_balances (emp_id, year, accrued, deducted, adjusted)
+            VALUES (NEW.emp_id, NEW.year,
+                    CASE NEW.kind WHEN 'accrual' THEN NEW.days ELSE 0 END,
+                    CASE NEW.kind WHEN 'deduction' THEN -NEW.days ELSE 0 END,
+                    CASE NEW.kind WHEN 'adjustment' THEN NEW.days ELSE 0 END)
+            ON CONFLICT (emp_id, year) DO UPDATE SET
+                accrued = accrued + excluded.accrued,
+                deducted = deducted + excluded.deducted,
+                adjusted = adjusted + excluded.adjusted;
+        END
+        ''',
+    ]),
+    # 7: Daily absence index (see absence.py): one row per employee per day of approved leave, and the
+    # number of employees out per day, so "who is out" and absence counts never expand date ranges.
+    (7, [
+        '''
+        CREATE TABLE IF NOT EXISTS daily_absences (
+            day TEXT NOT NULL,
+            emp_id INTEGER NOT NULL,
+            leave_id INTEGER NOT NULL,
+            PRIMARY KEY (day, emp_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS absence_counts (
+            day TEXT PRIMARY KEY,
+            absent INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        '''
+        WITH RECURSIVE leave_days(day, emp_id, leave_id, end_date) AS (
+            SELECT start_date, emp_id, leave_id, end_date FROM leave_requests
+            WHERE status = 'approved' AND date(start_date) = start_date AND date(end_date) = end_date
+            UNION ALL
+            SELECT date(day, '+1 day'), emp_id, leave_id, end_date FROM leave_days WHERE day < end_date
+        )
+        INSERT OR IGNORE INTO daily_absences (day, emp_id, leave_id)
+        SELECT day, emp_id, leave_id FROM leave_days
+        ''',
+        'INSERT INTO absence_counts (day, absent) SELECT day, COUNT(*) FROM daily_absences GROUP BY day',
+    ]),
+    # 8: Full-text search over employee names and leave reasons (FTS5 external-content tables kept in
+    # sync by triggers), and a name index so the employee listing streams in name order without a sort.
+    (8, [
+        'CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name)',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+            name, content='employees', content_rowid='emp_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_insert AFTER INSERT ON employees BEGIN
+            INSERT INTO employees_fts (rowid, name) VALUES (NEW.emp_id, NEW.name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_delete AFTER DELETE ON employees BEGIN
+            INSERT INTO employees_fts (employees_fts, rowid, name) VALUES ('delete', OLD.emp_id, OLD.name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_update AFTER UPDATE OF name ON employees BEGIN
+            INSERT INTO employees_fts (employees_fts, rowid, name) VALUES ('delete', OLD.emp_id, OLD.name);
+            INSERT INTO employees_fts (rowid, name) VALUES (NEW.emp_id, NEW.name);
+        END
+        ''',
+        "INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')",
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS leave_reasons_fts USING fts5(
+            leave_reason, content='leave_requests', content_rowid='leave_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_leave_reasons_fts_insert AFTER INSERT ON leave_requests BEGIN
+            INSERT INTO leave_reasons_fts (rowid, leave_reason) VALUES (NEW.leave_id, NEW.leave_reason);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_leave_reasons_fts_delete AFTER DELETE ON leave_requests BEGIN
+            INSERT INTO leave_reasons_fts (leave_reasons_fts, rowid, leave_reason)
+            VALUES ('delete', OLD.leave_id, OLD.leave_reason);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_leave_reasons_fts_update AFTER UPDATE OF leave_reason ON leave_requests BEGIN
+            INSERT INTO leave_reasons_fts (leave_reasons_fts, rowid, leave_reason)
+            VALUES ('delete', OLD.leave_id, OLD.leave_reason);
+            INSERT INTO leave_reasons_fts (rowid, leave_reason) VALUES (NEW.leave_id, NEW.leave_reason);
+        END
+        ''',
+        "INSERT INTO leave_reasons_fts (leave_reasons_fts) VALUES ('rebuild')",
+    ]),
+    # 9: One row per bulk import transaction that wrote leave requests (see bulk_import.py). Imported
+    # rows keep their leave_id and processed_on, so incremental exports use this to fall back to a full one.
+    (9, [
+        '''
+        CREATE TABLE IF NOT EXISTS import_batches (
+            batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            imported_on TEXT NOT NULL,
+            leave_requests INTEGER NOT NULL
+        )
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# The hot read queries issued by the portals, checked by check_query_plans().
+HOT_QUERIES = {
+    "employee history": (
+        "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.emp_id = ? ORDER BY lr.applied_on DESC, lr.leave_id DESC", (1,)),
+    "employee history page": (
+        "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.emp_id = ? AND (lr.applied_on, lr.leave_id) < (?, ?) "
+        "ORDER BY lr.applied_on DESC, lr.leave_id DESC LIMIT 21", (1, '2030-01-01', 10**9)),
+    "employee history by status": (
+        "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.emp_id = ? AND lr.status = ? ORDER BY lr.applied_on DESC, lr.leave_id DESC", (1, 'approved')),
+    "pending queue": (
+        "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.status = ? ORDER BY lr.applied_on DESC, lr.leave_id DESC", ('pending',)),
+    "pending queue page": (
+        "SELECT lr.*, e.name FROM leave_requests lr JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.status = ? AND (lr.applied_on, lr.leave_id) < (?, ?) "
+        "ORDER BY lr.applied_on DESC, lr.leave_id DESC LIMIT 21", ('pending', '2030-01-01', 10**9)),
+    "overlap check": (
+        "SELECT lr.leave_id FROM leave_requests lr WHERE lr.emp_id = ? AND lr.status IN (?, ?) "
+        "AND lr.start_date <= ? AND lr.end_date >= ?", (1, 'pending', 'approved', '2030-01-10', '2030-01-01')),
+    "export delta": (
+        "SELECT lr.*, e.name FROM leave_requests lr CROSS JOIN employees e ON lr.emp_id = e.emp_id "
+        "WHERE lr.leave_id IN (SELECT leave_id FROM leave_requests WHERE leave_id > ? "
+        "UNION ALL SELECT leave_id FROM leave_requests WHERE unlikely(processed_on > ?)) ORDER BY lr.leave_id",
+        (1000, '2030-01-01T00:00:00')),
+    "employee ledger": (
+        "SELECT * FROM leave_ledger WHERE emp_id = ? AND year = ? ORDER BY entry_id", (1, 2030)),
+    "absent on day": (
+        "SELECT a.emp_id, a.leave_id, e.name FROM daily_absences a JOIN employees e ON e.emp_id = a.emp_id "
+        "WHERE a.day = ? ORDER BY e.name", ('2030-01-01',)),
+    "absence counts": (
+        "SELECT day, absent FROM absence_counts WHERE day BETWEEN ? AND ? ORDER BY day", ('2030-01-01', '2030-12-31')),
+    "employees by role": (
+        "SELECT * FROM employees WHERE role=? ORDER BY name", ('employee',)),
+}
+
+def get_schema_version(conn):
+    """Returns the schema version recorded in the database header."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+@timed
+def migrate(db_name=None):
+    """
+    Brings the database up to SCHEMA_VERSION, applying each pending migration in its own
+    transaction. Safe to call on every start-up: it is a single PRAGMA read when up to date.
+    Returns the resulting schema version.
+    """
+    with connection(db_name) as conn:
+        version = get_schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+        for target, statements in MIGRATIONS:
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent start-ups serialize
+            # here and re-read the version instead of applying the same migration twice.
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if get_schema_version(conn) >= target:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {int(target)}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return get_schema_version(conn)
+
+def check_query_plans(db_name=None):
+    """
+    Runs EXPLAIN QUERY PLAN for the hot portal queries and returns {name: [plan lines]}
+    for every query that still does a full table scan (an empty dict means all are indexed).
+    """
+    scans = {}
+    with connection(db_name) as conn:
+        for name, (query, params) in HOT_QUERIES.items():
+            plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+            if any(line.startswith('SCAN') for line in plan):
+                scans[name] = plan
+    return scans
+
+# --- Script Entry Point ---
+
+if __name__ == "__main__":
+    print(f"Schema is at version {migrate()}.")
+    if "--check-plans" in sys.argv:
+        scans = check_query_plans()
+        for name, plan in scans.items():
+            print(f"Full scan in '{name}': {' / '.join(plan)}")
+        if scans:
+            sys.exit(1)
+        print("All hot queries use indexes.")
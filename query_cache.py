@@ -0,0 +1,68 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+# --- Constants ---
+# Maximum number of cached results kept across all cached helpers (least recently used are evicted)
+CACHE_SIZE = 512
+
+# Seconds a cached result may be served. Writes made through leave_service invalidate the cache
+# immediately via the data version; the TTL only bounds staleness from writers outside this process
+# (e.g. the CLI scripts or another app instance).
+CACHE_TTL = 30
+
+# --- Read-Through Query Cache ---
+# Streamlit reruns the whole script on every widget interaction, so the same read helpers are called
+# with the same arguments over and over. Results are cached per (function, arguments) and tagged with
+# the data version current when the query started; every committed write bumps the version, which
+# invalidates all earlier entries at once without having to know which queries a write affects.
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_data_version = 0
+_stats = {'hits': 0, 'misses': 0}
+
+def data_version():
+    """Returns the current data version."""
+    return _data_version
+
+def bump_data_version():
+    """Marks every cached result as stale. Call after committing a write."""
+    global _data_version
+    with _lock:
+        _data_version += 1
+
+def cached_query(func):
+    """Decorator that serves repeated calls from the cache until the data version changes or the TTL expires."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == _data_version and now - entry[1] < CACHE_TTL:
+                _entries.move_to_end(key)
+                _stats['hits'] += 1
+                return entry[2]
+            _stats['misses'] += 1
+            version = _data_version
+        result = func(*args, **kwargs)
+        with _lock:
+            _entries[key] = (version, now, result)
+            _entries.move_to_end(key)
+            while len(_entries) > CACHE_SIZE:
+                _entries.popitem(last=False)
+        return result
+    return wrapper
+
+def cache_stats():
+    """Returns hit/miss counters, the number of cached entries and the current data version."""
+    with _lock:
+        return {**_stats, 'entries': len(_entries), 'data_version': _data_version}
+
+def clear_cache():
+    """Drops every cached result and resets the hit/miss counters."""
+    with _lock:
+        _entries.clear()
+        _stats['hits'] = _stats['misses'] = 0
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from database import DB_NAME, connection, open_read_only
+from instrumentation import timed
+
+# --- Constants ---
+# The snapshot copy of DB_NAME used by snapshot reads (next to it: leave_management.snapshot.db)
+SNAPSHOT_PATH = os.environ.get("LEAVE_SNAPSHOT_PATH", os.path.splitext(DB_NAME)[0] + ".snapshot.db")
+# Refresh policy: a snapshot older than this many seconds is retaken before it is read (0 = every time)
+SNAPSHOT_MAX_AGE = float(os.environ.get("LEAVE_SNAPSHOT_MAX_AGE", 300))
+# Pages copied per backup step (4 MiB at the default 4 KiB page size) and the pause after each step,
+# which leaves the disk and the CPU to the app's writers between steps
+SNAPSHOT_PAGES_PER_STEP = 1024
+SNAPSHOT_STEP_PAUSE = 0.002
+
+# --- Snapshot Reads ---
+# Long exports read a point-in-time copy of the database instead of the live file. Under WAL a reader
+# never blocks a writer, but a long read transaction pins the WAL: checkpoints cannot get past it,
+# so while a multi-minute export runs the WAL keeps growing and every write and read in the app gets
+# slower. A snapshot pins it only for the copy, which is a sequential page copy through the sqlite3
+# backup API and much shorter than the export.
+#
+# The copy runs in page steps inside one read transaction on the source connection. The transaction
+# fixes the WAL snapshot being copied, so writes committed meanwhile neither restart the backup nor
+# leak into the copy, and the result is consistent as of the moment the copy started. It is written
+# to a uniquely named temporary file and renamed over the previous snapshot, so readers still on the
+# old copy keep their (unlinked) file until they close it, and processes refreshing at the same time
+# (the refresh lock only covers threads) each publish a complete copy.
+
+_refresh_lock = threading.Lock()
+
+def snapshot_age(path=SNAPSHOT_PATH):
+    """Returns the age in seconds of the data in the snapshot at path, or None if there is none."""
+    try:
+        return max(time.time() - os.path.getmtime(path), 0.0)
+    except OSError:
+        return None
+
+@timed
+def take_snapshot(path=SNAPSHOT_PATH, pages=SNAPSHOT_PAGES_PER_STEP, pause=SNAPSHOT_STEP_PAUSE):
+    """
+    Copies the live database to path in steps of `pages` pages, sleeping `pause` seconds after each.
+    The copy is consistent as of the start of the call, and its modification time is set to that
+    moment, so snapshot_age() measures how far behind the live data it is. Returns path.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    started = time.time()
+    target = sqlite3.connect(tmp_path)
+    try:
+        with connection() as source:
+            # The first read opens the read transaction that every backup step then copies from
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            try:
+                source.backup(target, pages=pages, progress=lambda status, remaining, total: time.sleep(pause))
+            finally:
+                source.rollback()
+        # A rollback-journal copy opens read-only without -wal/-shm files next to it
+        target.execute("PRAGMA journal_mode=DELETE")
+    except BaseException:
+        target.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    target.close()
+    os.utime(tmp_path, (started, started))
+    os.replace(tmp_path, path)
+    return path
+
+def ensure_snapshot(max_age=None, path=SNAPSHOT_PATH):
+    """
+    Applies the refresh policy: returns path, retaking the snapshot first when it is missing or older
+    than max_age seconds (default SNAPSHOT_MAX_AGE). Concurrent callers in a process share one refresh.
+    """
+    max_age = SNAPSHOT_MAX_AGE if max_age is None else max_age
+    with _refresh_lock:
+        age = snapshot_age(path)
+        if age is None or age > max_age or max_age <= 0:
+            take_snapshot(path)
+    return path
+
+@contextmanager
+def read_connection(snapshot=False, max_age=None):
+    """
+    Connection for a report: a pooled connection to the live database, or with snapshot=True a
+    read-only connection to the snapshot (refreshed per ensure_snapshot), closed after the block.
+    """
+    if not snapshot:
+        with connection() as conn:
+            yield conn
+        return
+    conn = open_read_only(ensure_snapshot(max_age))
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+# --- Script Entry Point ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take or refresh the snapshot copy that exports read with --snapshot.")
+    parser.add_argument("--max-age", type=float, help=f"retake only if older than this many seconds "
+                                                      f"(default: always; reads use {SNAPSHOT_MAX_AGE:g})")
+    args = parser.parse_args()
+    if not os.path.exists(DB_NAME):
+        print(f"Error: Database file '{DB_NAME}' not found.")
+    else:
+        try:
+            before = snapshot_age()
+            ensure_snapshot(0 if args.max_age is None else args.max_age)
+            refreshed = before is None or snapshot_age() < before
+            print(f"Snapshot '{SNAPSHOT_PATH}' ({os.path.getsize(SNAPSHOT_PATH) / 2**20:.1f} MiB) is "
+                  f"{'freshly taken' if refreshed else f'{snapshot_age():.0f}s old'}.")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Snapshot failed: {e}")
@@ -0,0 +1,17 @@
+import pytest
+
+import database
+
+
+@pytest.fixture
+def scratch_database(tmp_path, monkeypatch):
+    """
+    Points the app at an empty database file in tmp_path: database.DB_NAME for this process and
+    LEAVE_DB_NAME for subprocesses. Both are restored, and the pools closed, after the test.
+    """
+    path = str(tmp_path / "leave_test.db")
+    monkeypatch.setenv("LEAVE_DB_NAME", path)
+    monkeypatch.setattr(database, "DB_NAME", path)
+    database.close_pools()
+    yield path
+    database.close_pools()
@@ -0,0 +1,81 @@
+"""Bulk import: an exported history re-imports intact, and overlaps in a file are resolved by status."""
+import csv
+
+import bulk_import
+import check_employee_leave
+import database
+import generate_data
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def use_fresh_database(path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", path)
+    database.close_pools()
+
+
+def leaves_by_status(status):
+    with database.connection() as conn:
+        return {tuple(row) for row in conn.execute('SELECT leave_id, emp_id, start_date, end_date FROM leave_requests '
+                                                   'WHERE status = ?', (status,))}
+
+
+def test_reimported_export_keeps_every_approved_leave(scratch_database, tmp_path, monkeypatch):
+    generate_data.generate(200, 20000, seed=3)
+    approved = leaves_by_status('approved')
+    export_path = str(tmp_path / "history.csv")
+    monkeypatch.setattr(check_employee_leave, "DB_NAME", scratch_database)
+    check_employee_leave.export_employee_leave_history_to_csv(export_path)
+    exported = read_csv(export_path)
+
+    # A new pending request ahead of each of the first 50 approved ones, starting a day earlier and
+    # overlapping it, as an HR system might send
+    header = list(exported[0])
+    clashes = [row for row in exported if row['LeaveStatus'] == 'approved'][:50]
+    pending = [{**row, 'leave_id': '', 'LeaveStatus': 'pending', 'DateProcessed': '',
+                'LeaveStartDate': f"{row['LeaveStartDate'][:8]}{int(row['LeaveStartDate'][8:]) - 1:02d}"
+                if row['LeaveStartDate'][8:] != '01' else row['LeaveStartDate']} for row in clashes]
+    path = str(tmp_path / "import.csv")
+    write_csv(path, header, [[row[column] for column in header] for row in pending + exported])
+
+    use_fresh_database(str(tmp_path / "imported.db"), monkeypatch)
+    summary = bulk_import.import_csv(path)
+
+    assert leaves_by_status('approved') == approved
+    assert summary['employees'] == len({row['emp_id'] for row in exported})
+    assert summary['rejected'] == len(pending)
+    rejected = read_csv(str(tmp_path / "import.rejected.csv"))
+    assert list(rejected[0]) == header + ['row', 'error']
+    assert {row['error'] for row in rejected} == {"Overlaps another pending or approved leave in the file."}
+    assert [int(row['row']) for row in rejected] == list(range(1, len(pending) + 1))
+
+
+def test_overlaps_in_a_file_are_resolved_by_status(scratch_database, tmp_path):
+    path = str(tmp_path / "leaves.csv")
+    write_csv(path, ['emp_id', 'name', 'start_date', 'end_date', 'status'], [
+        [7, 'Ada Lovelace', '2026-01-01', '2026-01-10', 'pending'],    # loses to the approved row 2
+        [7, 'Ada Lovelace', '2026-01-05', '2026-01-06', 'approved'],
+        [7, 'Ada Lovelace', '2026-01-08', '2026-01-12', 'pending'],    # only overlaps the rejected row 1
+        [7, 'Ada Lovelace', '2026-01-01', '2026-01-31', 'rejected'],   # rejected requests never clash
+        [7, 'Ada Lovelace', '2026-01-12', '2026-01-12', 'pending'],    # overlaps the kept row 3
+    ])
+    summary = bulk_import.import_csv(path)
+
+    assert summary == {**summary, 'rows': 5, 'employees': 1, 'leave_requests': 3, 'rejected': 2}
+    assert [(row['row'], row['error']) for row in read_csv(str(tmp_path / "leaves.rejected.csv"))] == [
+        ('1', "Overlaps another pending or approved leave in the file."),
+        ('5', "Overlaps another pending or approved leave in the file."),
+    ]
+    with database.connection() as conn:
+        stored = conn.execute('SELECT start_date, status FROM leave_requests ORDER BY start_date, status').fetchall()
+    assert [tuple(row) for row in stored] == [('2026-01-01', 'rejected'), ('2026-01-05', 'approved'), ('2026-01-08', 'pending')]
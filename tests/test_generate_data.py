@@ -0,0 +1,32 @@
+"""Generated history must follow the app's own rules, so benchmarks built on it take the success paths."""
+import pytest
+
+import database
+import generate_data
+import leave_service
+
+
+def test_generated_history_follows_the_app_rules(scratch_database):
+    generate_data.generate(300, 30000, seed=7)
+    with database.connection() as conn:
+        most_pending = conn.execute("SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM leave_requests "
+                                    "WHERE status = 'pending' GROUP BY emp_id)").fetchone()[0]
+        active_overlaps = conn.execute('''
+            SELECT COUNT(*) FROM leave_requests a JOIN leave_requests b
+              ON a.emp_id = b.emp_id AND a.leave_id < b.leave_id
+             AND a.start_date <= b.end_date AND b.start_date <= a.end_date
+            WHERE a.status IN ('pending', 'approved') AND b.status IN ('pending', 'approved')
+        ''').fetchone()[0]
+        pending = [row[0] for row in conn.execute("SELECT leave_id FROM leave_requests WHERE status = 'pending'")]
+        manager = conn.execute("SELECT emp_id FROM employees WHERE role = 'manager' LIMIT 1").fetchone()[0]
+    assert most_pending == 1
+    assert active_overlaps == 0
+    # Every pending request passes approve_leave's guards (one pending request, enough balance)
+    results = leave_service.approve_leaves(manager, pending)
+    assert [message for success, message in results.values() if not success] == []
+
+
+@pytest.mark.parametrize("args", [(0, 10), (-1, 0), (10, -1)])
+def test_generate_rejects_impossible_sizes(scratch_database, args):
+    with pytest.raises(ValueError):
+        generate_data.generate(*args)
@@ -0,0 +1,33 @@
+"""The hot portal queries (migrations.HOT_QUERIES) must be index searches on a migrated, seeded database."""
+import database
+import generate_data
+from migrations import HOT_QUERIES, check_query_plans
+
+# The tables (and the aliases the hot queries give them) that must never be scanned in full
+SCANNED_TABLES = {'leave_requests', 'lr', 'employees', 'e'}
+
+
+def full_scans(plans):
+    """{query name: offending plan lines} for plan lines that scan leave_requests or employees."""
+    scans = {name: [line for line in plan if line.startswith('SCAN ') and line.split()[1] in SCANNED_TABLES]
+             for name, plan in plans.items()}
+    return {name: lines for name, lines in scans.items() if lines}
+
+
+def test_hot_queries_do_not_pin_indexes():
+    # INDEXED BY would make the plan check pass whatever the planner would choose on its own
+    for name, (query, _) in HOT_QUERIES.items():
+        assert "INDEXED BY" not in query.upper(), name
+
+
+def test_hot_queries_do_not_scan(scratch_database):
+    generate_data.generate(200, 20000, seed=1)
+    assert full_scans(check_query_plans()) == {}
+
+
+def test_check_catches_a_missing_index(scratch_database):
+    generate_data.generate(50, 2000, seed=1)
+    with database.transaction() as conn:
+        conn.execute('DROP INDEX idx_leave_requests_status_applied')
+        conn.execute('DROP INDEX idx_leave_requests_emp_status_start')
+    assert 'pending queue' in full_scans(check_query_plans())
@@ -0,0 +1,66 @@
+"""
+Writers during a full CSV export, live vs. --snapshot, at a small scale (see
+benchmarks/bench_snapshot_export.py for the full benchmark). Takes about ten seconds.
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import query_cache
+from benchmarks.common import seed_history
+
+
+@pytest.fixture
+def bench(scratch_database, tmp_path, monkeypatch):
+    """The snapshot benchmark module, pointed at the scratch database and a snapshot in tmp_path."""
+    snapshot_path = str(tmp_path / "leave_test.snapshot.db")
+    monkeypatch.setenv("LEAVE_SNAPSHOT_PATH", snapshot_path)
+    # Its first import points LEAVE_DB_NAME at the benchmark's own file; monkeypatch undoes that too
+    from benchmarks import bench_snapshot_export
+    monkeypatch.setenv("LEAVE_DB_NAME", scratch_database)
+    monkeypatch.setenv("LEAVE_SNAPSHOT_PATH", snapshot_path)
+    monkeypatch.setattr(bench_snapshot_export, "DB_PATH", scratch_database)
+    monkeypatch.setattr(query_cache, "CACHE_TTL", 0)
+    return bench_snapshot_export
+
+
+def test_snapshot_export_keeps_the_wal_small_and_writers_fast(bench):
+    seed_history(500, 50000)
+    employees, manager = bench.prepare_writers(100)
+
+    # Writer.stop() re-raises the first failed apply or approve, so every timed write succeeded
+    results = bench.run_phases(bench.Writer(employees, manager))
+
+    _, live, live_wal = results["live export"]
+    _, snapshot, snapshot_wal = results["snapshot export"]
+    _, baseline, baseline_wal = results["no export"]
+    assert min(len(live), len(snapshot), len(baseline)) > 50
+    # The live export pins the WAL, so it grows with every write; the snapshot export pins it only
+    # while the backup copies the pages
+    assert live_wal > 2 * baseline_wal
+    assert snapshot_wal < live_wal / 2
+    # Measured in the same run, so both phases share the machine's load: the snapshot export must not
+    # make writers slower than the live one, in the tail or at the extreme
+    assert np.percentile(snapshot, 99) <= np.percentile(live, 99)
+    assert max(snapshot) < max(live)
+
+
+def test_concurrent_refreshes_publish_a_complete_snapshot(bench, tmp_path):
+    seed_history(200, 20000)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Two processes retaking the snapshot at once (the refresh lock only covers threads)
+    refreshes = [subprocess.Popen([sys.executable, "snapshot.py"], cwd=root, stdout=subprocess.PIPE, text=True)
+                 for _ in range(2)]
+    outputs = [refresh.communicate()[0] for refresh in refreshes]
+    assert all("Snapshot failed" not in output for output in outputs), outputs
+
+    conn = bench.database.open_read_only(os.environ["LEAVE_SNAPSHOT_PATH"])
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert conn.execute("SELECT COUNT(*) FROM leave_requests").fetchone()[0] == 20000
+    finally:
+        conn.close()
+    assert not list(tmp_path.glob("*.tmp"))